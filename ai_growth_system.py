@@ -1,83 +1,11 @@
-import requests
-try:
-    import feedparser as _feedparser  # type: ignore
-except Exception:
-    _feedparser = None  # type: ignore
-    # Minimal fallback if feedparser is not installed
-    import xml.etree.ElementTree as ET
-    from types import SimpleNamespace
-    import html
-    import re
-
-    class FeedparserFallback:  # fallback shim with a parse(url) API
-        @staticmethod
-        def parse(url: str):
-            try:
-                resp = requests.get(
-                    url,
-                    timeout=(5, 15),  # 5s connect, 15s read timeout
-                    headers={
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-                    }
-                )
-                # Parse XML with namespaces preserved
-                text = resp.text
-                root = ET.fromstring(text)
-                entries = []
-
-                # Helper to find elements regardless of namespace
-                def findall_ns(root, tag):
-                    results = []
-                    for elem in root.iter():
-                        if elem.tag.endswith(tag):
-                            results.append(elem)
-                    return results
-
-                # RSS items
-                for it in findall_ns(root, "item"):
-                    title = (it.findtext(".//title") or "").strip()
-                    summary = (it.findtext(".//description") or "").strip()
-                    link = (it.findtext(".//link") or "").strip()
-                    entries.append(
-                        SimpleNamespace(
-                            title=html.unescape(title),
-                            summary=html.unescape(summary),
-                            link=link,
-                        )
-                    )
-
-                # Atom entries
-                if not entries:
-                    for it in findall_ns(root, "entry"):
-                        title = (it.findtext(".//title") or "").strip()
-                        link_el = None
-                        # Find link element regardless of namespace
-                        for child in it:
-                            if child.tag.endswith("link"):
-                                link_el = child
-                                break
-                        link = ""
-                        if link_el is not None:
-                            link = link_el.attrib.get("href") or (link_el.text or "")
-                        summary = (it.findtext(".//summary") or it.findtext(".//content") or "").strip()
-                        entries.append(
-                            SimpleNamespace(
-                                title=html.unescape(title),
-                                summary=html.unescape(summary),
-                                link=link,
-                            )
-                        )
-
-                return SimpleNamespace(entries=entries)
-            except Exception:
-                return SimpleNamespace(entries=[])
 import random
 import re
-try:
-    # محاولة استيراد googletrans مع التعامل مع غيابه
-    from googletrans import Translator  # type: ignore
-except Exception:
-    Translator = None  # سيتم التعامل مع ذلك في translate_text
+
+from feeds import (DEFAULT_CACHE_DIR, DEFAULT_CACHE_MAX_BYTES, DEFAULT_CACHE_TTL, DEFAULT_MAX_WORKERS,
+                   FeedCache, fetch_feeds)
+from seen_entries import DEFAULT_TTL as DEFAULT_SEEN_TTL, SeenEntries
+# googletrans اختياري: بدونه تُعاد النصوص كما هي (انظر translation.py)
+from translation import DEFAULT_MAX_ENTRIES, CachedTranslator, TranslationCache, default_backend
 
 # Constants and configuration
 RSS_FEEDS = [
@@ -85,6 +13,8 @@ RSS_FEEDS = [
     "https://rss.cnn.com/rss/money_news_international.rss",
     "https://www.entrepreneur.com/latest.rss"
 ]
+# عدد المدخلات المأخوذة من كل feed (يتوقف التحليل والتنزيل بعدها)
+ENTRIES_PER_FEED = 3
 
 SEO_TITLES = [
     "دليل شامل: {} في عام {} - كل ما تحتاج معرفته",
@@ -102,39 +32,97 @@ try:
     import importlib
     _cfg = importlib.import_module("config")  # ملف اختياري
     BANNED_KEYWORDS = getattr(_cfg, "BANNED_KEYWORDS", DEFAULT_BANNED_KEYWORDS)
+    # عدد الطلبات المتزامنة عند جلب الـ feeds
+    FEED_MAX_WORKERS = getattr(_cfg, "FEED_MAX_WORKERS", DEFAULT_MAX_WORKERS)
+    # ذاكرة الـ feeds على القرص: مدة الصلاحية بالثواني والحجم الأقصى بالبايت
+    FEED_CACHE_TTL = getattr(_cfg, "FEED_CACHE_TTL", DEFAULT_CACHE_TTL)
+    FEED_CACHE_MAX_BYTES = getattr(_cfg, "FEED_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES)
+    # الحد الأقصى لعدد الترجمات المحفوظة (تُحذف الأقدم استخداماً أولاً)
+    TRANSLATION_CACHE_MAX_ENTRIES = getattr(_cfg, "TRANSLATION_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+    # مدة تذكّر المدخلات التي عولجت سابقاً (بالثواني)
+    SEEN_ENTRIES_TTL = getattr(_cfg, "SEEN_ENTRIES_TTL", DEFAULT_SEEN_TTL)
 except Exception:
     BANNED_KEYWORDS = DEFAULT_BANNED_KEYWORDS
+    FEED_MAX_WORKERS = DEFAULT_MAX_WORKERS
+    FEED_CACHE_TTL = DEFAULT_CACHE_TTL
+    FEED_CACHE_MAX_BYTES = DEFAULT_CACHE_MAX_BYTES
+    TRANSLATION_CACHE_MAX_ENTRIES = DEFAULT_MAX_ENTRIES
+    SEEN_ENTRIES_TTL = DEFAULT_SEEN_TTL
 
-def get_topic_trends():
-    """جلب الاتجاهات والمواضيع الرائجة من RSS feeds"""
-    articles = []
-    
-    for url in RSS_FEEDS:
+# المترجم مع ذاكرة الترجمة الدائمة؛ يُنشأ عند أول استخدام ويمكن استبداله (مثلاً بـ IdentityBackend في الاختبارات)
+TRANSLATOR = None
+
+def get_translator():
+    global TRANSLATOR
+    if TRANSLATOR is None:
+        TRANSLATOR = CachedTranslator(default_backend(), TranslationCache(max_entries=TRANSLATION_CACHE_MAX_ENTRIES))
+    return TRANSLATOR
+
+def translate_many(texts, dest="ar"):
+    """ترجمة قائمة نصوص: المحفوظ يُؤخذ من الذاكرة والباقي يُرسل في طلب واحد مجمّع"""
+    return get_translator().translate_many(texts, dest)
+
+def translate_text(text, dest="ar"):
+    """ترجمة نص واحد مع fallback إلى النص الأصلي إن تعذرت الترجمة"""
+    return get_translator().translate(text, dest)
+
+def get_topic_trends(feeds=None, max_workers=None, session=None, cache=None, seen=None):
+    """جلب الاتجاهات والمواضيع الرائجة من RSS feeds
+
+    تُجلب كل الـ feeds بالتوازي (بحد أقصى max_workers طلباً) عبر جلسة HTTP واحدة
+    تعيد استخدام الاتصالات، ثم تُعالج النتائج بترتيب RSS_FEEDS.
+    الطلبات مشروطة (ETag/Last-Modified) عبر ذاكرة الـ feeds، فالـ feed الذي لم
+    يتغير يُرجع 304 وتُستخدم مدخلاته المحفوظة دون تنزيل أو تحليل.
+    يُحلل كل feed أثناء تنزيله وتتوقف القراءة بعد ENTRIES_PER_FEED مدخلات.
+    تُستبعد المدخلات التي عولجت في تشغيل سابق (انظر seen_entries.py) قبل أي
+    ترجمة، ثم تُترجم نصوص المدخلات الجديدة وعناوينها في طلب واحد مجمّع، فيجد
+    generate_article_plan العناوين بعدها في ذاكرة الترجمة.
+
+    تُرجع (المقالات، المدخلات المستبعدة بالفلترة)، ويحمل كل مقال مدخله تحت "entry".
+    لا تُسجَّل أي مدخلات هنا: على المستدعي تسجيلها في seen بعد كتابة المقالات.
+    """
+    candidates = []
+    skipped = []
+    feeds = RSS_FEEDS if feeds is None else feeds
+    max_workers = FEED_MAX_WORKERS if max_workers is None else max_workers
+    if cache is None:
+        cache = FeedCache(DEFAULT_CACHE_DIR, ttl=FEED_CACHE_TTL, max_bytes=FEED_CACHE_MAX_BYTES)
+    if seen is None:
+        seen = SeenEntries(ttl=SEEN_ENTRIES_TTL)
+
+    for url, d, error in fetch_feeds(feeds, max_workers=max_workers, session=session, cache=cache,
+                                     limit=ENTRIES_PER_FEED):
+        if error is not None:
+            print(f"خطأ في جلب البيانات من {url}: {error}")
+            continue
         try:
-            parse_func = _feedparser.parse if '_feedparser' in globals() and _feedparser is not None else FeedparserFallback.parse
-            d = parse_func(url)
-            for entry in d.entries[:3]:
+            for entry in seen.new_entries(d.entries[:ENTRIES_PER_FEED]):
                 text = entry.title + " " + getattr(entry, "summary", "")
-                if len(text) <= 30:
-                    continue
-                # فلترة المواضيع الممنوعة وفق سياسة مبسطة
-                if any(b in text.lower() for b in BANNED_KEYWORDS):
+                # فلترة النصوص القصيرة والمواضيع الممنوعة وفق سياسة مبسطة
+                if len(text) <= 30 or any(b in text.lower() for b in BANNED_KEYWORDS):
+                    skipped.append(entry)
                     continue
-                # ترجمة عربية مع fallback عبر دالة مساعدة
-                ar_text = translate_text(text)
-                # إزالة علامات HTML ومنع النسخ الحرفي
-                ar_text = re.sub(r"<[^>]+>", " ", ar_text)
-                ar_text = re.sub(r"\s+", " ", ar_text).strip()
-                articles.append({
-                    "title": entry.title,
-                    "summary": ar_text[:400] + ("..." if len(ar_text) > 400 else ""),
-                    "link": entry.link
-                })
+                candidates.append((entry, text))
         except Exception as e:
             print(f"خطأ في جلب البيانات من {url}: {e}")
             continue
-    
-    return articles
+
+    # ترجمة عربية لكل النصوص والعناوين في طلب واحد، مع fallback إلى النص الأصلي
+    texts = [text for _, text in candidates]
+    titles = [entry.title for entry, _ in candidates]
+    translated = translate_many(texts + titles)
+    articles = []
+    for (entry, _), ar_text in zip(candidates, translated[:len(texts)]):
+        # إزالة علامات HTML ومنع النسخ الحرفي
+        ar_text = re.sub(r"<[^>]+>", " ", ar_text)
+        ar_text = re.sub(r"\s+", " ", ar_text).strip()
+        articles.append({
+            "title": entry.title,
+            "summary": ar_text[:400] + ("..." if len(ar_text) > 400 else ""),
+            "link": entry.link,
+            "entry": entry,
+        })
+    return articles, skipped
 
 def fetch_google_trends(topic):
     """جلب الكلمات المفتاحية المرتبطة بالموضوع"""
@@ -231,7 +219,11 @@ def render_article_template(article):
     return html
 # التنفيذ الرئيسي (مثال لتوليد خطة + مقال)
 if __name__ == "__main__":
-    trends = get_topic_trends()
+    seen = SeenEntries(ttl=SEEN_ENTRIES_TTL)
+    trends, skipped = get_topic_trends(seen=seen)
+    if not trends:
+        print("لا توجد مواضيع جديدة منذ آخر تشغيل")
+    written = []
     for trend in trends[:3]:
         main_topic = trend['title']
         article = generate_article_plan(main_topic)
@@ -239,4 +231,9 @@ if __name__ == "__main__":
         filename = "".join(c for c in main_topic[:15] if c.isalnum() or c in (' ', '_')).replace(' ','_') + ".html"
         with open(filename, "w", encoding="utf-8") as f:
             f.write(code)
+        written.append(trend['entry'])
         print(f"تم توليد مقال: {main_topic}")
+    # تُسجَّل المدخلات بعد كتابة مقالاتها فقط، فالمواضيع غير المكتوبة تبقى لتشغيل لاحق
+    # (ولا كتابة على القرص إن لم تظهر مدخلات جديدة)
+    seen.mark(skipped + written)
+    seen.save()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Content-addressed backup store shared by the scripts that rewrite pages.
+
+Instead of NAME.html.bak siblings, originals are kept once per distinct
+content under .backups/objects/<sha1[:2]>/<sha1[2:]>, and every run writes a
+manifest (.backups/runs/<run id>.json) listing what it modified, created or
+renamed. A run can be restored from its manifest, and old runs pruned.
+
+All writes go through a temp file and os.replace(), and write_if_changed()
+skips files whose content is already identical, so a no-op run touches
+nothing on disk and leaves the git diff empty.
+
+Usage: python3 backup_store.py list
+       python3 backup_store.py restore RUN_ID [PATH ...]
+       python3 backup_store.py prune [--keep N]
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+
+DEFAULT_DIR = '.backups'
+
+
+def atomic_write_bytes(path, data: bytes):
+    """Write data to path via a temp file in the same directory and os.replace(), keeping its mode."""
+    path = os.fspath(path)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def atomic_write_text(path, text: str):
+    atomic_write_bytes(path, text.encode('utf-8'))
+
+
+def read_bytes(path) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+class BackupStore:
+    """Blob store plus run manifests rooted at root/.backups; safe to use from several processes."""
+
+    def __init__(self, root='.', directory: str = DEFAULT_DIR):
+        self.root = os.path.abspath(os.fspath(root))
+        self.directory = os.path.join(self.root, directory)
+        self.objects = os.path.join(self.directory, 'objects')
+        self.runs_dir = os.path.join(self.directory, 'runs')
+
+    def rel(self, path) -> str:
+        return os.path.relpath(os.path.abspath(os.fspath(path)), self.root).replace(os.sep, '/')
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.objects, digest[:2], digest[2:])
+
+    def put(self, data: bytes) -> str:
+        """Store data (once per distinct content) and return its SHA-1."""
+        digest = hashlib.sha1(data).hexdigest()
+        blob = self._blob_path(digest)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            atomic_write_bytes(blob, data)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        with open(self._blob_path(digest), 'rb') as f:
+            return f.read()
+
+    def backup_entry(self, path, data: Optional[bytes] = None) -> Optional[Dict[str, str]]:
+        """Store the current content of path and return its manifest entry (None if path does not exist)."""
+        if data is None:
+            data = read_bytes(path)
+            if data is None:
+                return None
+        return {'action': 'modified', 'path': self.rel(path), 'sha1': self.put(data)}
+
+    def start_run(self, label: str) -> 'BackupRun':
+        return BackupRun(self, label)
+
+    def run_ids(self) -> List[str]:
+        if not os.path.isdir(self.runs_dir):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.runs_dir) if name.endswith('.json'))
+
+    def load_run(self, run_id: str) -> dict:
+        with open(os.path.join(self.runs_dir, run_id + '.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def restore(self, run_id: str, paths: Optional[List[str]] = None) -> List[str]:
+        """Undo a run (optionally only for some paths), newest change first; returns restored paths."""
+        restored = []
+        wanted = set(paths) if paths else None
+        for entry in reversed(self.load_run(run_id)['files']):
+            if wanted is not None and entry['path'] not in wanted and entry.get('to') not in wanted:
+                continue
+            target = os.path.join(self.root, entry['path'])
+            if entry['action'] == 'modified':
+                atomic_write_bytes(target, self.get(entry['sha1']))
+            elif entry['action'] == 'created':
+                if os.path.exists(target) and hashlib.sha1(read_bytes(target)).hexdigest() == entry['sha1']:
+                    os.unlink(target)
+                else:
+                    print(f"Keeping {entry['path']}: changed since it was created")
+                    continue
+            elif entry['action'] == 'renamed':
+                source = os.path.join(self.root, entry['to'])
+                if os.path.exists(target):
+                    print(f"Cannot move {entry['to']} back: {entry['path']} exists")
+                    continue
+                if os.path.exists(source):
+                    os.replace(source, target)
+                else:
+                    atomic_write_bytes(target, self.get(entry['sha1']))
+            restored.append(entry['path'])
+        return restored
+
+    def prune(self, keep: int = 20) -> Tuple[int, int]:
+        """Delete all but the newest keep runs, then blobs no remaining run refers to."""
+        run_ids = self.run_ids()
+        removed_runs = run_ids[:-keep] if keep > 0 else run_ids
+        for run_id in removed_runs:
+            os.unlink(os.path.join(self.runs_dir, run_id + '.json'))
+        referenced = {entry['sha1'] for run_id in self.run_ids() for entry in self.load_run(run_id)['files']}
+        removed_blobs = 0
+        if os.path.isdir(self.objects):
+            for prefix in os.listdir(self.objects):
+                folder = os.path.join(self.objects, prefix)
+                for name in os.listdir(folder):
+                    if prefix + name not in referenced:
+                        os.unlink(os.path.join(folder, name))
+                        removed_blobs += 1
+                if not os.listdir(folder):
+                    os.rmdir(folder)
+        return len(removed_runs), removed_blobs
+
+
+class BackupRun:
+    """Changes made by one script run; the manifest is written on save() only if something changed."""
+
+    def __init__(self, store: BackupStore, label: str):
+        self.store = store
+        self.label = label
+        self.id = f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{label}"
+        self.files: List[Dict[str, str]] = []
+        self._backed_up = set()
+
+    def add(self, entry: Optional[Dict[str, str]]):
+        """Record an entry (from BackupStore.backup_entry in this or a worker process)."""
+        if entry is None:
+            return
+        if entry['action'] == 'modified':
+            # Only the first (pre-run) version of a file matters for restore
+            if entry['path'] in self._backed_up:
+                return
+            self._backed_up.add(entry['path'])
+        self.files.append(entry)
+
+    def write_if_changed(self, path, text: str) -> bool:
+        """Atomically write text to path, backing up the old content; False if it was already identical."""
+        data = text.encode('utf-8')
+        old = read_bytes(path)
+        if old == data:
+            return False
+        if old is None:
+            self.files.append({'action': 'created', 'path': self.store.rel(path),
+                               'sha1': hashlib.sha1(data).hexdigest()})
+        else:
+            self.add(self.store.backup_entry(path, old))
+        atomic_write_bytes(path, data)
+        return True
+
+    def rename(self, old, new):
+        """Rename a file, recording its content so the run can be undone even if it is edited later."""
+        entry = self.store.backup_entry(old)
+        os.replace(old, new)
+        entry.update(action='renamed', to=self.store.rel(new))
+        self.files.append(entry)
+
+    def save(self):
+        if not self.files:
+            return
+        os.makedirs(self.store.runs_dir, exist_ok=True)
+        manifest = {'run': self.id, 'label': self.label,
+                    'created': datetime.now().isoformat(timespec='seconds'), 'files': self.files}
+        atomic_write_text(os.path.join(self.store.runs_dir, self.id + '.json'),
+                          json.dumps(manifest, ensure_ascii=False, indent=2))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and restore page backups')
+    parser.add_argument('--root', default='.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='list recorded runs')
+    restore = sub.add_parser('restore', help='undo a run')
+    restore.add_argument('run_id')
+    restore.add_argument('paths', nargs='*', help='only restore these paths')
+    prune = sub.add_parser('prune', help='delete old runs and unreferenced blobs')
+    prune.add_argument('--keep', type=int, default=20)
+    args = parser.parse_args()
+
+    store = BackupStore(args.root)
+    if args.command == 'list':
+        for run_id in store.run_ids():
+            manifest = store.load_run(run_id)
+            print(f"{run_id}  {len(manifest['files'])} files")
+    elif args.command == 'restore':
+        restored = store.restore(args.run_id, args.paths)
+        print(f"Restored {len(restored)} files from {args.run_id}")
+    elif args.command == 'prune':
+        runs, blobs = store.prune(args.keep)
+        print(f"Removed {runs} runs and {blobs} blobs")
+
+
+if __name__ == '__main__':
+    main()
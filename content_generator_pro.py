@@ -1,8 +1,13 @@
 from datetime import datetime
+import os
 import random
 import re
 
+from backup_store import BackupStore
+from content_index import DEFAULT_DB, ContentIndex
+from near_duplicates import DEFAULT_HASHER, LSHIndex, text_signature, update_signatures
 from self_optimization import SelfOptimizationEngine
+from site_scan import SiteDocument
 
 TOPICS = [
     "الاستثمار في مصر",
@@ -133,19 +138,65 @@ def render_article(title, topic, year, keywords):
 </html>"""
     return html
 
-def generate_articles(n=3, year="2025", improvement_dict=None):
+# عدد محاولات توليد بديل قبل تخطي مقال مشابه لصفحة موجودة
+MAX_REGENERATE_ATTEMPTS = 5
+
+
+class DuplicateGate:
+    """فهرس MinHash في الذاكرة للصفحات الموجودة، يُحمَّل مرة واحدة لكل تشغيل"""
+
+    def __init__(self, base='.', threshold=0.7):
+        self.threshold = threshold
+        self.lsh = LSHIndex()
+        # التواقيع المخزنة في فهرس المحتوى تُعاد استخدامها، ولا تُحسب إلا للصفحات الجديدة أو المعدلة
+        with ContentIndex(os.path.join(base, DEFAULT_DB)) as index:
+            index.refresh(base)
+            signatures, _ = update_signatures(index, base)
+        for path, sig in signatures.items():
+            self.lsh.add(path, sig)
+
+    def find_similar(self, html, file_name):
+        """إرجاع (الصفحة، نسبة التشابه) لأقرب صفحة موجودة تتجاوز الحد، أو None"""
+        sig = text_signature(SiteDocument.from_text(html).text, DEFAULT_HASHER)
+        if sig is None:
+            return None
+        # الملف الذي سيُستبدل بنفس الاسم لا يُعد تكراراً
+        matches = self.lsh.query(sig, self.threshold, exclude=file_name)
+        return matches[0] if matches else None
+
+    def add(self, file_name, html):
+        """إضافة مقال مكتوب للتو حتى تُقارن به بقية مقالات نفس التشغيل"""
+        sig = text_signature(SiteDocument.from_text(html).text, DEFAULT_HASHER)
+        if sig is not None:
+            self.lsh.add(file_name, sig)
+
+
+def generate_articles(n=3, year="2025", improvement_dict=None, gate=None):
+    if gate is None:
+        gate = DuplicateGate()
+    # استخدم اقتراح الكلمات المفتاحية والتحسين الذاتي لو توفر
+    add_keywords = improvement_dict.get('focus_keywords', []) if improvement_dict else []
+    # المقال الذي يحمل اسم ملف موجود يستبدله؛ تُحفظ النسخة السابقة في مخزن النسخ الاحتياطية
+    run = BackupStore().start_run('generate-articles')
     for i in range(n):
-        topic = random.choice(TOPICS)
-        # استخدم اقتراح الكلمات المفتاحية والتحسين الذاتي لو توفر
-        add_keywords = improvement_dict.get('focus_keywords', []) if improvement_dict else []
-        title = random.choice(TEMPLATES).format(topic=topic, year=year)
-        keywords = suggest_keywords(topic, add=add_keywords)
-        html = render_article(title, topic, year, keywords)
-        file_name = re.sub(r"\s+", "_", topic[:40])
-        file_name = re.sub(r"[^\w\u0600-\u06FF_]+", "", file_name) + ".html"
-        with open(file_name, "w", encoding="utf-8") as f:
-            f.write(html)
-        print(f"تم إنشاء المقال: {file_name} - {title}")
+        for attempt in range(MAX_REGENERATE_ATTEMPTS):
+            topic = random.choice(TOPICS)
+            title = random.choice(TEMPLATES).format(topic=topic, year=year)
+            keywords = suggest_keywords(topic, add=add_keywords)
+            html = render_article(title, topic, year, keywords)
+            file_name = re.sub(r"\s+", "_", topic[:40])
+            file_name = re.sub(r"[^\w\u0600-\u06FF_]+", "", file_name) + ".html"
+            similar = gate.find_similar(html, file_name)
+            if similar is None:
+                break
+            print(f"⚠️ مقال مشابه لـ {similar[0]} بنسبة {similar[1]:.2f}: {title} - إعادة التوليد")
+        else:
+            print(f"⏭️ تم تخطي المقال {i + 1}: لم يُعثر على موضوع غير مكرر بعد {MAX_REGENERATE_ATTEMPTS} محاولات")
+            continue
+        if run.write_if_changed(file_name, html):
+            print(f"تم إنشاء المقال: {file_name} - {title}")
+        gate.add(file_name, html)
+    run.save()
 
 if __name__ == "__main__":
     # ربط سكربت التحسين الذاتي
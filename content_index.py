@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""Persistent SQLite index of per-page metadata, keyed by path and content hash.
+
+Each refresh walks the site with site_scan, skips pages whose size and mtime
+are unchanged, and re-extracts only pages whose SHA-1 changed (on a process
+pool with jobs > 1). A page's metadata, placeholder hits and MinHash
+signature all come from the one read and tokenization of its SiteDocument,
+so everything else (sitemap priorities, placeholder/duplicate checks,
+assets/site-index.json) can then be answered with queries instead of
+rescanning HTML.
+
+Usage: python3 content_index.py [--db PATH] [--full] [--export-site-index]
+"""
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+
+from generate_sitemap import SitemapGenerator
+from near_duplicates import DEFAULT_HASHER, Signature, text_signature
+from site_scan import DEFAULT_CACHE, DEFAULT_EXCLUDES, SiteFile, process_map, walk_site
+
+DEFAULT_DB = os.path.join('.cache', 'site_index.sqlite')
+SCHEMA_VERSION = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    path TEXT PRIMARY KEY,
+    sha1 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    h1 TEXT NOT NULL,
+    category TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    changefreq TEXT NOT NULL,
+    word_count INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    placeholder_hits INTEGER NOT NULL,
+    indexed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS links (
+    path TEXT NOT NULL REFERENCES pages(path) ON DELETE CASCADE,
+    href TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS images (
+    path TEXT NOT NULL REFERENCES pages(path) ON DELETE CASCADE,
+    src TEXT NOT NULL,
+    alt TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS placeholders (
+    path TEXT NOT NULL REFERENCES pages(path) ON DELETE CASCADE,
+    line INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signatures (
+    path TEXT PRIMARY KEY REFERENCES pages(path) ON DELETE CASCADE,
+    scheme TEXT NOT NULL,
+    sha1 TEXT NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS links_path ON links(path);
+CREATE INDEX IF NOT EXISTS images_path ON images(path);
+CREATE INDEX IF NOT EXISTS placeholders_path ON placeholders(path);
+"""
+
+# Sitemap classifier categories -> categories used by assets/site-index.json
+SITE_INDEX_CATEGORIES = {
+    'predefined': 'main',
+    'high_priority_articles': 'financial',
+    'arabic': 'financial',
+    'business_articles': 'business',
+    'tech_articles': 'tech',
+    'general_articles': 'content',
+}
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def simhash(text: str, shingle: int = 3) -> str:
+    """64-bit SimHash over word shingles, as 16 hex digits (near-identical texts differ in few bits)."""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return '0' * 16
+    weights = [0] * 64
+    grams = (' '.join(words[i:i + shingle]) for i in range(max(1, len(words) - shingle + 1)))
+    for gram in grams:
+        h = int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return f"{value:016x}"
+
+
+def _pack(sig: Optional[Sequence[int]]) -> bytes:
+    return array('I', sig).tobytes() if sig is not None else b''
+
+
+class PageRecord(NamedTuple):
+    """What the index stores for one page, extracted from a single read and tokenization."""
+    sha1: str
+    title: str
+    h1: str
+    word_count: int
+    fingerprint: str
+    placeholders: List[Dict[str, object]]
+    links: List[str]
+    images: List[Tuple[str, str]]
+    signature: Optional[Signature]
+
+
+def extract_page(item: Tuple[SiteFile, Optional[str]]) -> Tuple[Optional[PageRecord], Optional[str]]:
+    """(record, error) for a (file, indexed sha1) pair; record is None if the content hash is unchanged.
+
+    Module-level so refresh() can run it in worker processes.
+    """
+    f, indexed_sha1 = item
+    try:
+        doc = DEFAULT_CACHE.get(f.full, f.size, f.mtime_ns)
+        if doc.sha1 == indexed_sha1:
+            return None, None
+        text = doc.text
+        return PageRecord(doc.sha1, doc.title, doc.h1, len(text.split()), simhash(text), doc.placeholder_hits,
+                          doc.links, [(img.get('src', ''), img.get('alt', '')) for img in doc.images],
+                          text_signature(text)), None
+    except (OSError, UnicodeDecodeError) as e:
+        return None, str(e)
+
+
+class ContentIndex:
+    """SQLite-backed page index; use refresh() before querying."""
+
+    def __init__(self, db_path: str = DEFAULT_DB):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            # The index is a cache: rebuild from scratch on schema changes
+            self.conn.executescript('DROP TABLE IF EXISTS signatures; DROP TABLE IF EXISTS placeholders; '
+                                    'DROP TABLE IF EXISTS links; DROP TABLE IF EXISTS images; '
+                                    'DROP TABLE IF EXISTS pages;')
+            self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.conn.executescript(SCHEMA)
+        self._classifier = None
+        # Paths (re)extracted by the last refresh()
+        self.indexed = set()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def classifier(self):
+        if self._classifier is None:
+            self._classifier = SitemapGenerator().classifier
+        return self._classifier
+
+    def refresh(self, base='.', full: bool = False, jobs: int = 1,
+                files: Optional[Iterable[SiteFile]] = None) -> Dict[str, int]:
+        """Bring the index up to date with the site; returns added/changed/removed/unchanged counts.
+
+        files can pass in the result of an earlier walk_site() over base to avoid walking it again.
+        With jobs > 1, pages are extracted on a process pool; the re-extracted paths are left in indexed.
+        """
+        stats = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+        known = {row['path']: row for row in
+                 self.conn.execute('SELECT path, sha1, size, mtime_ns FROM pages')}
+        if files is None:
+            files = walk_site(base, ('*.html',), DEFAULT_EXCLUDES, jobs)
+        seen = set()
+        pending = []
+        for f in files:
+            seen.add(f.path)
+            row = known.get(f.path)
+            if not full and row is not None and row['size'] == f.size and row['mtime_ns'] == f.mtime_ns:
+                stats['unchanged'] += 1
+                continue
+            pending.append((f, None if full or row is None else row['sha1']))
+        self.indexed = set()
+        with self.conn:
+            for (f, _), (record, error) in zip(pending, process_map(extract_page, pending, jobs)):
+                if error is not None:
+                    print(f"Failed to index {f.path}: {error}")
+                elif record is None:
+                    stats['unchanged'] += 1
+                    self.conn.execute('UPDATE pages SET size = ?, mtime_ns = ? WHERE path = ?',
+                                      (f.size, f.mtime_ns, f.path))
+                else:
+                    self._store_page(f, record)
+                    self.indexed.add(f.path)
+                    stats['changed' if f.path in known else 'added'] += 1
+            removed = [path for path in known if path not in seen]
+            self.conn.executemany('DELETE FROM pages WHERE path = ?', [(p,) for p in removed])
+            stats['removed'] = len(removed)
+        return stats
+
+    def _store_page(self, f: SiteFile, record: PageRecord):
+        category, info = self.classifier.classify(f.path)
+        self.conn.execute('DELETE FROM pages WHERE path = ?', (f.path,))
+        self.conn.execute(
+            'INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (f.path, record.sha1, f.size, f.mtime_ns, record.title, record.h1, category,
+             info['priority'], info['changefreq'], record.word_count, record.fingerprint,
+             len(record.placeholders), datetime.now().isoformat(timespec='seconds')))
+        self.conn.executemany('INSERT INTO links VALUES (?, ?)', [(f.path, href) for href in record.links])
+        self.conn.executemany('INSERT INTO images VALUES (?, ?, ?)',
+                              [(f.path, src, alt) for src, alt in record.images])
+        self.conn.executemany('INSERT INTO placeholders VALUES (?, ?, ?)',
+                              [(f.path, hit['line'], hit['text']) for hit in record.placeholders])
+        self.conn.execute('INSERT INTO signatures VALUES (?, ?, ?, ?)',
+                          (f.path, DEFAULT_HASHER.key, record.sha1, _pack(record.signature)))
+
+    # --- queries -------------------------------------------------------
+
+    def page(self, path: str) -> Optional[sqlite3.Row]:
+        return self.conn.execute('SELECT * FROM pages WHERE path = ?', (path,)).fetchone()
+
+    def pages(self, order_by: str = 'path') -> Iterator[sqlite3.Row]:
+        if order_by not in ('path', 'priority'):
+            raise ValueError(f"unsupported order: {order_by}")
+        order = 'CAST(priority AS REAL) DESC, path' if order_by == 'priority' else 'path'
+        return self.conn.execute(f'SELECT * FROM pages ORDER BY {order}')
+
+    def placeholders(self, paths: Optional[Iterable[str]] = None) -> Dict[str, List[Dict[str, object]]]:
+        """Placeholder hits as {path: [{'line', 'text'}]} (pages without hits omitted), optionally only for paths."""
+        wanted = None if paths is None else set(paths)
+        report: Dict[str, List[Dict[str, object]]] = {}
+        for path, line, text in self.conn.execute('SELECT path, line, text FROM placeholders ORDER BY path, rowid'):
+            if wanted is None or path in wanted:
+                report.setdefault(path, []).append({'line': line, 'text': text})
+        return report
+
+    def fingerprints(self) -> Dict[str, str]:
+        return {row[0]: row[1] for row in self.conn.execute('SELECT path, fingerprint FROM pages')}
+
+    def signatures(self, scheme: str) -> Dict[str, Tuple[str, Optional[Tuple[int, ...]]]]:
+        """Stored {path: (sha1, signature)} for one hashing scheme; None marks pages too short to sign."""
+        stored = {}
+        for path, sha1, blob in self.conn.execute(
+                'SELECT path, sha1, signature FROM signatures WHERE scheme = ?', (scheme,)):
+            stored[path] = (sha1, tuple(array('I', blob)) if blob else None)
+        return stored
+
+    def store_signatures(self, scheme: str, rows: Iterable[Tuple[str, str, Optional[Sequence[int]]]]):
+        """Save (path, sha1, signature or None) rows computed with the given scheme."""
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?)',
+                [(path, scheme, sha1, _pack(sig)) for path, sha1, sig in rows])
+
+    def clear_signatures(self):
+        with self.conn:
+            self.conn.execute('DELETE FROM signatures')
+
+    def export_site_index(self, out_path='assets/site-index.json',
+                          site_url='https://zezooo342.github.io') -> bool:
+        """Write assets/site-index.json from the index, keeping hand-assigned categories and priorities."""
+        curated = {}
+        existing = None
+        if os.path.exists(out_path):
+            try:
+                existing = json.loads(Path(out_path).read_text(encoding='utf-8'))
+                curated = {p['path']: (i, p) for i, p in enumerate(existing.get('pages', []))}
+            except (OSError, ValueError, TypeError, AttributeError, KeyError):
+                existing, curated = None, {}
+
+        ranked = []
+        categories: Dict[str, int] = {}
+        for row in self.pages(order_by='priority'):
+            if row['path'] == '404.html':
+                continue
+            path = '/' + row['path']
+            position, previous = curated.get(path, (len(curated), {}))
+            category = previous.get('category') or SITE_INDEX_CATEGORIES.get(row['category'], 'content')
+            priority = previous.get('priority', float(row['priority']))
+            title = previous.get('title') or row['title'] or row['h1'] or row['path']
+            ranked.append((position, -priority, {'path': path, 'title': title,
+                                                 'category': category, 'priority': priority}))
+            categories[category] = categories.get(category, 0) + 1
+        # Curated pages keep their hand-picked order; new pages follow by priority
+        ranked.sort(key=lambda item: item[:2])
+        pages = [page for _, _, page in ranked]
+
+        data = {
+            'pages': pages,
+            'metadata': {
+                'siteUrl': site_url,
+                'lastUpdated': datetime.now().strftime('%Y-%m-%d'),
+                'totalPages': len(pages),
+                'categories': categories,
+            },
+        }
+        content = json.dumps(data, ensure_ascii=False, indent=2)
+        if existing is not None:
+            # Only the date changed: keep the file as-is to avoid churn
+            if isinstance(existing.get('metadata'), dict):
+                existing['metadata'].pop('lastUpdated', None)
+            data['metadata'].pop('lastUpdated')
+            if existing == data:
+                return False
+        Path(out_path).write_text(content, encoding='utf-8')
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh the SQLite content index')
+    parser.add_argument('base', nargs='?', default='.')
+    parser.add_argument('--db', help=f'index database (default: <base>/{DEFAULT_DB})')
+    parser.add_argument('--full', action='store_true', help='re-extract every page')
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--export-site-index', action='store_true',
+                        help='also regenerate assets/site-index.json from the index')
+    args = parser.parse_args()
+
+    with ContentIndex(args.db or os.path.join(args.base, DEFAULT_DB)) as index:
+        stats = index.refresh(args.base, full=args.full, jobs=args.jobs)
+        print(f"Indexed {args.base}: {stats['added']} added, {stats['changed']} changed, "
+              f"{stats['removed']} removed, {stats['unchanged']} unchanged")
+        if args.export_site_index:
+            out = os.path.join(args.base, 'assets', 'site-index.json')
+            if index.export_site_index(out):
+                print(f"Wrote {out}")
+            else:
+                print(f"{out} is up to date")
+
+
+if __name__ == '__main__':
+    main()
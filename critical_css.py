@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""Critical (above-the-fold) CSS extraction for the site's pages.
+
+parse_css() splits a stylesheet into rules and block at-rules. fold_elements()
+collects the elements a page renders first (html, body and the first body
+elements, up to FOLD_ELEMENTS tags or FOLD_TEXT_CHARS characters of text).
+critical_css() keeps the rules whose selectors can match one of those
+elements and returns them minified.
+
+Matching is deliberately generous: pseudo-classes/elements and attribute
+values are ignored, `>` is treated as "some ancestor" and `+`/`~` as "some
+element with the same parent", so a rule is only dropped when it cannot
+apply to the first screen.
+
+Results are cached in .cache/critical-css/ under a key made of the
+stylesheets' hashes and the page's fold skeleton (the set of element
+paths, without text), so pages built from the same template share one
+entry and only the first of them pays for the matching.
+"""
+from html.parser import HTMLParser
+from typing import FrozenSet, List, NamedTuple, Optional, Sequence, Tuple, Union
+import hashlib
+import os
+import re
+
+from backup_store import atomic_write_text
+
+CACHE_DIR = os.path.join('.cache', 'critical-css')
+# Part of the cache key; bumped whenever matching or minification changes the output
+CACHE_VERSION = '2'
+FOLD_ELEMENTS = 80
+FOLD_TEXT_CHARS = 1200
+# Block at-rules whose rules are filtered one by one, and those kept whole;
+# others (@keyframes, @page, ...) are left to the full stylesheet
+INNER_RULE_AT = ('@media', '@supports')
+KEEP_AT = ('@font-face',)
+
+SKIP_TAGS = {'script', 'style', 'template', 'noscript'}
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+# Whitespace around ':' only goes inside declarations: in a selector `.a :first-child` is a descendant
+MINIFY_RE = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|\s*([{};,>])\s*|\s+''')
+DECLARATIONS_MINIFY_RE = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|\s*([{};:,>])\s*|\s+''')
+COMPOUND_RE = re.compile(r'(\*|[a-zA-Z][\w-]*)?((?:[#.][\w-]+|\[[^\]]*\])*)')
+PSEUDO_RE = re.compile(r'::?[\w-]+(?:\([^)]*\))?')
+PRINT_ONLY_RE = re.compile(r'@media\s+(?:only\s+)?print\s*$', re.IGNORECASE)
+# States that cannot apply at first paint
+INTERACTIVE_RE = re.compile(r':(?:hover|focus|focus-within|focus-visible|active|visited)\b')
+COMBINATOR_RE = re.compile(r'\s*([>+~])\s*|\s+')
+
+
+class Rule(NamedTuple):
+    selector: str
+    body: str
+
+
+class AtRule(NamedTuple):
+    prelude: str
+    children: Union[Tuple, str]     # nested nodes for @media/@supports, raw body otherwise
+
+
+class Element(NamedTuple):
+    tag: str
+    id: str
+    classes: FrozenSet[str]
+    attrs: FrozenSet[str]
+
+
+def minify(css: str, declarations: bool = False) -> str:
+    """Minified selectors/preludes, or a declaration block with declarations=True."""
+    def replace(m):
+        if m.group(1):
+            return m.group(1)
+        return m.group(2) or ' '
+    regex = DECLARATIONS_MINIFY_RE if declarations else MINIFY_RE
+    return regex.sub(replace, css).replace(';}', '}').strip()
+
+
+def _block_end(text: str, start: int) -> int:
+    """Index of the '}' closing the block opened just before start (strings are skipped)."""
+    depth = 1
+    i = start
+    while i < len(text):
+        c = text[i]
+        if c in '"\'':
+            i = text.find(c, i + 1)
+            if i == -1:
+                return len(text)
+        elif c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return len(text)
+
+
+def parse_css(text: str) -> Tuple:
+    text = COMMENT_RE.sub('', text)
+    nodes = []
+    i = 0
+    while True:
+        while i < len(text) and text[i].isspace():
+            i += 1
+        if i >= len(text):
+            break
+        brace = text.find('{', i)
+        semi = text.find(';', i)
+        if text[i] == '@' and semi != -1 and (brace == -1 or semi < brace):
+            i = semi + 1  # statement at-rule (@import, @charset): left to the full stylesheet
+            continue
+        if brace == -1:
+            break
+        prelude = ' '.join(text[i:brace].split())
+        end = _block_end(text, brace + 1)
+        body = text[brace + 1:end]
+        if prelude.startswith('@'):
+            inner = parse_css(body) if prelude.lower().startswith(INNER_RULE_AT) else body
+            nodes.append(AtRule(prelude, inner))
+        elif prelude:
+            nodes.append(Rule(prelude, body))
+        i = end + 1
+    return tuple(nodes)
+
+
+class _FoldParser(HTMLParser):
+    class Done(Exception):
+        pass
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack: List[Element] = []
+        self.found = set()
+        self.count = 0
+        self.text_chars = 0
+        self.in_head = False
+        self.skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'head':
+            self.in_head = True
+        if tag in SKIP_TAGS:
+            self.skip += 1
+            return
+        if self.in_head or self.skip:
+            return
+        values = dict(attrs)
+        el = Element(tag, values.get('id') or '', frozenset((values.get('class') or '').split()),
+                     frozenset(name for name, _ in attrs))
+        self.found.add(tuple(self.stack) + (el,))
+        if tag not in ('html', 'body'):
+            self.count += 1
+            if self.count >= FOLD_ELEMENTS:
+                raise self.Done
+        if tag not in VOID_TAGS:
+            self.stack.append(el)
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self.in_head = False
+        if tag in SKIP_TAGS:
+            self.skip = max(0, self.skip - 1)
+            return
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                break
+
+    def handle_data(self, data):
+        if not (self.in_head or self.skip):
+            self.text_chars += len(data.strip())
+            if self.text_chars >= FOLD_TEXT_CHARS:
+                raise self.Done
+
+
+def fold_elements(html: str) -> FrozenSet[Tuple[Element, ...]]:
+    """Paths (root .. element) of the elements rendered above the fold."""
+    parser = _FoldParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except _FoldParser.Done:
+        pass
+    return frozenset(parser.found)
+
+
+def _describe(path: Tuple[Element, ...]) -> str:
+    """Stable text form of an element path (frozenset order varies between processes)."""
+    return '>'.join(f"{el.tag}#{el.id}.{'.'.join(sorted(el.classes))}[{','.join(sorted(el.attrs))}]"
+                    for el in path)
+
+
+def _compound(text: str) -> Optional[Element]:
+    m = COMPOUND_RE.fullmatch(PSEUDO_RE.sub('', text))
+    if m is None:
+        return None
+    tag = (m.group(1) or '*').lower()
+    parts = re.findall(r'[#.][\w-]+|\[[^\]]*\]', m.group(2))
+    ids = [p[1:] for p in parts if p[0] == '#']
+    classes = frozenset(p[1:] for p in parts if p[0] == '.')
+    attrs = frozenset(re.split(r'[~|^$*]?=', p[1:-1], 1)[0].strip().lower() for p in parts if p[0] == '[')
+    return Element(tag, ids[0] if ids else '', classes, attrs)
+
+
+def _matches(c: Element, el: Element) -> bool:
+    return ((c.tag == '*' or c.tag == el.tag) and (not c.id or c.id == el.id)
+            and c.classes <= el.classes and c.attrs <= el.attrs)
+
+
+def _matches_at(compounds, combinators, i: int, path, siblings) -> bool:
+    """Whether compounds[:i + 1] can match with compounds[i] on the last element of path."""
+    if not _matches(compounds[i], path[-1]):
+        return False
+    if i == 0:
+        return True
+    if combinators[i - 1] in ('+', '~'):
+        candidates = siblings.get(path[:-1], ())
+    else:
+        candidates = [path[:k] for k in range(len(path) - 1, 0, -1)]
+    return any(_matches_at(compounds, combinators, i - 1, p, siblings) for p in candidates)
+
+
+def selector_matches(selector: str, paths) -> bool:
+    if INTERACTIVE_RE.search(selector):
+        return False
+    # split() with the capture group alternates compound, combinator ('>', '+', '~' or None), compound, ...
+    parts = COMBINATOR_RE.split(selector.strip())
+    compounds = [_compound(part) for part in parts[::2] if part]
+    combinators = [c or ' ' for c in parts[1::2]]
+    if not compounds or None in compounds or len(compounds) != len(combinators) + 1:
+        return True  # unsupported syntax: keep the rule
+    siblings = {}
+    if '+' in combinators or '~' in combinators:
+        for path in paths:
+            siblings.setdefault(path[:-1], []).append(path)
+    last = len(compounds) - 1
+    return any(_matches_at(compounds, combinators, last, path, siblings) for path in paths)
+
+
+def _split_selectors(selector: str) -> List[str]:
+    parts, depth, start = [], 0, 0
+    for i, c in enumerate(selector):
+        if c in '([':
+            depth += 1
+        elif c in ')]':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            parts.append(selector[start:i])
+            start = i + 1
+    parts.append(selector[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _filter(nodes: Sequence, paths) -> List[str]:
+    out = []
+    for node in nodes:
+        if isinstance(node, Rule):
+            used = [s for s in _split_selectors(node.selector) if selector_matches(s, paths)]
+            if used:
+                out.append(minify(','.join(used)) + '{' + minify(node.body, declarations=True).rstrip(';') + '}')
+        elif isinstance(node.children, tuple):
+            if PRINT_ONLY_RE.match(node.prelude):
+                continue
+            inner = _filter(node.children, paths)
+            if inner:
+                out.append(minify(node.prelude) + '{' + ''.join(inner) + '}')
+        elif node.prelude.lower().startswith(KEEP_AT):
+            out.append(minify(node.prelude) + '{' + minify(node.children, declarations=True).rstrip(';') + '}')
+    return out
+
+
+def critical_css(sheets: Sequence[Tuple[str, Tuple]], html: str, cache_dir: Optional[str] = None) -> str:
+    """Minified critical CSS of a page for stylesheets given as (sha1, parse_css nodes), in link order."""
+    paths = fold_elements(html)
+    key = None
+    if cache_dir:
+        skeleton = '\n'.join(sorted(_describe(path) for path in paths))
+        parts = [CACHE_VERSION] + [sha for sha, _ in sheets] + [skeleton]
+        key = hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+        cached = os.path.join(cache_dir, key + '.css')
+        if os.path.exists(cached):
+            with open(cached, encoding='utf-8') as f:
+                return f.read()
+    css = ''.join(''.join(_filter(nodes, paths)) for _, nodes in sheets)
+    if key:
+        os.makedirs(cache_dir, exist_ok=True)
+        atomic_write_text(os.path.join(cache_dir, key + '.css'), css)
+    return css
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""RSS/Atom fetching for ai_growth_system.py.
+
+All feeds are downloaded over one pooled requests.Session (keep-alive, one
+connection pool per host sized to the worker count) by a bounded thread
+pool, so the total latency is roughly that of the slowest feed instead of
+the sum of all of them. Bodies are parsed while they stream in by
+StreamingFeedParser (RSS and Atom in one pass, stdlib only); with an entry
+limit the download stops as soon as that many entries have been read.
+feedparser, when installed, only handles bodies that are not well-formed
+XML. Entries are normalized to objects with title, summary, link and id.
+
+With a FeedCache, each feed's ETag, Last-Modified and parsed entries are
+kept on disk (.cache/feeds/). Requests then carry
+If-None-Match/If-Modified-Since, and a 304 answer returns the cached
+entries without downloading or parsing anything; a record cut at an entry
+limit only serves calls asking for that many entries or fewer. Records
+older than the TTL are dropped, and the least recently used ones are
+evicted once the cache exceeds its size limit.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import hashlib
+import html
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backup_store import atomic_write_text
+
+try:
+    import feedparser as _feedparser  # type: ignore
+except Exception:
+    _feedparser = None  # type: ignore
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = (5, 15)  # 5s connect, 15s read timeout
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'feeds')
+DEFAULT_CACHE_TTL = 7 * 24 * 3600
+DEFAULT_CACHE_MAX_BYTES = 50 * 1024 * 1024
+# Bumped whenever the stored record layout or entry normalization changes
+CACHE_VERSION = 2
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
+
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+# Namespaces whose direct children of an item/entry are read (plain RSS 2.0 has none)
+ENTRY_CHILD_NS = ('', ATOM_NS, '{http://purl.org/rss/1.0/}', '{http://purl.org/rss/1.0/modules/content/}')
+ENTRY_TAGS = ('item', 'entry')
+# Child element -> entry field; earlier names win for the same field
+FIELD_TAGS = (('title', 'title'), ('link', 'link'), ('guid', 'id'), ('id', 'id'),
+              ('description', 'summary'), ('summary', 'summary'), ('encoded', 'summary'), ('content', 'summary'))
+CHUNK_SIZE = 16 * 1024
+
+
+def _split_tag(tag: str) -> Tuple[str, str]:
+    if tag.startswith('{'):
+        ns, _, local = tag[1:].partition('}')
+        return '{' + ns + '}', local
+    return '', tag
+
+
+class StreamingFeedParser:
+    """Incremental RSS 1.0/2.0 and Atom parser; feed() it chunks of the raw body.
+
+    RSS items and Atom entries are recognized in the same pass, and each one
+    is released as soon as it has been read, so memory stays flat on large
+    feeds. feed() returns True once `limit` entries have been parsed; the
+    rest of the document does not need to be read at all.
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        self.entries: List[Dict[str, str]] = []
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._entry_depth = None
+        self._depth = 0
+
+    @property
+    def done(self) -> bool:
+        return self.limit is not None and len(self.entries) >= self.limit
+
+    def feed(self, data: bytes) -> bool:
+        if not self.done:
+            try:
+                self._parser.feed(data)
+            finally:  # entries completed before a syntax error are kept
+                self._read_events()
+        return self.done
+
+    def close(self):
+        if not self.done:
+            try:
+                self._parser.close()
+            finally:
+                self._read_events()
+
+    def _read_events(self):
+        for event, elem in self._parser.read_events():
+            if event == 'start':
+                self._depth += 1
+                if self._entry_depth is None and _split_tag(elem.tag)[1] in ENTRY_TAGS:
+                    self._entry_depth = self._depth
+                continue
+            self._depth -= 1
+            if self._entry_depth is not None and self._depth + 1 == self._entry_depth:
+                self._entry_depth = None
+                self.entries.append(self._entry(elem))
+                elem.clear()
+                if self.done:
+                    return
+
+    @staticmethod
+    def _entry(elem) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        for child in elem:
+            ns, local = _split_tag(child.tag)
+            if ns not in ENTRY_CHILD_NS:
+                continue
+            if local == 'link' and ns == ATOM_NS:
+                # Atom: <link href="..."/>, the alternate (or untyped) link is the article
+                if child.get('rel', 'alternate') == 'alternate' and child.get('href'):
+                    found.setdefault('link', child.get('href').strip())
+                continue
+            text = ''.join(child.itertext()).strip()
+            if text:
+                found.setdefault(local, text)
+        record = {'title': '', 'summary': '', 'link': '', 'id': ''}
+        for tag, field in FIELD_TAGS:
+            if not record[field] and found.get(tag):
+                record[field] = found[tag]
+        record['title'] = html.unescape(record['title'])
+        record['summary'] = html.unescape(record['summary'])
+        return record
+
+
+def _entry_record(entry) -> Dict[str, str]:
+    get = entry.get if isinstance(entry, dict) else lambda key, default='': getattr(entry, key, default)
+    return {
+        'title': get('title', '') or '',
+        'summary': get('summary', '') or '',
+        'link': get('link', '') or '',
+        'id': get('id', '') or get('guid', '') or '',
+    }
+
+
+def make_feed(records: Sequence[Dict[str, str]]):
+    return SimpleNamespace(entries=[SimpleNamespace(**r) for r in records])
+
+
+def read_feed(chunks: Iterable[bytes], limit: Optional[int] = None) -> Tuple[bytes, object, bool]:
+    """Parse a feed body from an iterable of chunks, stopping after limit entries.
+
+    Returns (bytes read, feed, complete); complete is False when the chunks
+    were not read to the end or not all of them could be parsed. Bodies that
+    are not well-formed XML are re-read in full and handed to feedparser when
+    it is installed, which copes with broken markup; without it, the entries
+    parsed before the error are kept.
+    """
+    parser = StreamingFeedParser(limit)
+    read: List[bytes] = []
+    chunks = iter(chunks)
+    try:
+        for chunk in chunks:
+            read.append(chunk)
+            if parser.feed(chunk):
+                return b''.join(read), make_feed(parser.entries), False
+        parser.close()
+    except ET.ParseError:
+        if _feedparser is not None:
+            read.extend(chunks)
+            body = b''.join(read)
+            entries = [_entry_record(e) for e in _feedparser.parse(body).entries]
+            return body, make_feed(entries[:limit] if limit is not None else entries), True
+        return b''.join(read), make_feed(parser.entries), False
+    return b''.join(read), make_feed(parser.entries), True
+
+
+def parse_feed(data: bytes, limit: Optional[int] = None):
+    """Parsed feed from a response body: .entries with title, summary, link and id."""
+    # Fed in slices: expat parses whatever it is given, so one big chunk would be read to the end
+    return read_feed((data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)), limit)[1]
+
+
+class FeedCache:
+    """Per-URL records under directory: <key>.json holding the validators and parsed entries.
+
+    Every record lives in its own file written atomically, so the cache can
+    be used from the fetch threads without locking.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_CACHE_TTL,
+                 max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def _path(self, url: str, ext: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + ext)
+
+    def get(self, url: str, limit: Optional[int] = None) -> Optional[dict]:
+        """The cached record for url, or None if missing, expired, from another cache version or
+        holding fewer entries than limit asks for."""
+        path = self._path(url, '.json')
+        try:
+            with open(path, encoding='utf-8') as f:
+                record = json.load(f)
+            stored_at = os.path.getmtime(path)
+        except (OSError, ValueError):
+            return None
+        if record.get('version') != CACHE_VERSION or record.get('url') != url:
+            return None
+        if self.ttl and time.time() - stored_at > self.ttl:
+            return None
+        stored_limit = record.get('limit')
+        if stored_limit is not None and (limit is None or limit > stored_limit):
+            return None
+        return record
+
+    def revalidated(self, url: str, record: dict):
+        """Renew a record the server confirmed unchanged (304); also marks it as recently used.
+
+        Only the file's mtime is touched (the TTL and LRU order are based on
+        it), so an unchanged feed costs no writes.
+        """
+        try:
+            os.utime(self._path(url, '.json'))
+        except OSError:
+            pass
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], feed,
+            limit: Optional[int] = None):
+        """Store a fetched feed; limit is the entry limit the body was cut at (None if read in full)."""
+        os.makedirs(self.directory, exist_ok=True)
+        record = {
+            'version': CACHE_VERSION,
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'limit': limit,
+            'entries': [_entry_record(e) for e in feed.entries],
+        }
+        atomic_write_text(self._path(url, '.json'), json.dumps(record, ensure_ascii=False))
+
+    def evict(self) -> int:
+        """Drop expired records, then least recently used ones above max_bytes; returns records removed."""
+        if not os.path.isdir(self.directory):
+            return 0
+        records: Dict[str, List] = {}
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            path = os.path.join(self.directory, name)
+            try:
+                if ext == '.xml':
+                    os.unlink(path)  # raw body kept by earlier versions of the cache
+                    continue
+                if ext != '.json':
+                    continue
+                st = os.stat(path)
+            except OSError:
+                continue
+            records[key] = [st.st_mtime, st.st_size]
+        now = time.time()
+        removed = {key for key, (used, _) in records.items() if self.ttl and now - used > self.ttl}
+        live = sorted((item for item in records.items() if item[0] not in removed), key=lambda item: item[1][0])
+        total = sum(size for _, (_, size) in live)
+        for key, (_, size) in live:
+            if total <= self.max_bytes:
+                break
+            removed.add(key)
+            total -= size
+        for key in removed:
+            try:
+                os.unlink(os.path.join(self.directory, key + '.json'))
+            except OSError:
+                pass
+        return len(removed)
+
+
+def make_session(pool_size: int = DEFAULT_MAX_WORKERS) -> requests.Session:
+    """Session with keep-alive connection pools large enough for pool_size concurrent requests."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def fetch_feed(session: requests.Session, url: str, timeout=DEFAULT_TIMEOUT, cache: Optional[FeedCache] = None,
+               limit: Optional[int] = None):
+    """Fetch and parse one feed; with limit, the download stops once that many entries are parsed."""
+    record = cache.get(url, limit) if cache is not None else None
+    headers = {}
+    if record is not None:
+        if record.get('etag'):
+            headers['If-None-Match'] = record['etag']
+        if record.get('last_modified'):
+            headers['If-Modified-Since'] = record['last_modified']
+    with session.get(url, timeout=timeout, headers=headers, stream=True) as resp:
+        if resp.status_code == 304 and record is not None:
+            cache.revalidated(url, record)
+            return make_feed(record['entries'][:limit])
+        resp.raise_for_status()
+        # Leaving the block early closes the connection instead of reading the rest
+        _, feed, complete = read_feed(resp.iter_content(CHUNK_SIZE), limit)
+    if cache is not None:
+        cache.put(url, resp.headers.get('ETag'), resp.headers.get('Last-Modified'), feed,
+                  None if complete else limit)
+    return feed
+
+
+def fetch_feeds(urls: Sequence[str], max_workers: int = DEFAULT_MAX_WORKERS,
+                session: Optional[requests.Session] = None, timeout=DEFAULT_TIMEOUT,
+                fetch: Callable = fetch_feed, cache: Optional[FeedCache] = None, limit: Optional[int] = None
+                ) -> List[Tuple[str, object, Optional[Exception]]]:
+    """Fetch and parse feeds concurrently; returns (url, feed or None, error or None) in input order.
+
+    limit caps the entries parsed (and downloaded) per feed.
+    """
+    own_session = session is None
+    if own_session:
+        session = make_session(max(1, min(max_workers, len(urls))))
+
+    def task(url):
+        try:
+            return url, fetch(session, url, timeout, cache=cache, limit=limit), None
+        except Exception as e:
+            return url, None, e
+
+    try:
+        if max_workers <= 1 or len(urls) <= 1:
+            return [task(url) for url in urls]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as pool:
+            return list(pool.map(task, urls))
+    finally:
+        if own_session:
+            session.close()
+        if cache is not None:
+            cache.evict()
@@ -6,16 +6,540 @@
 """
 
 import os
-import glob
+import re
+import argparse
+import json
+import filecmp
+import gzip
+import hashlib
+import functools
+import subprocess
 import urllib.parse
 from datetime import datetime
+from xml.sax.saxutils import escape
 import xml.etree.ElementTree as ET
 
+from site_scan import DEFAULT_CACHE, DEFAULT_EXCLUDES, walk_site
+
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# حدود بروتوكول sitemaps.org لكل ملف
+MAX_URLS_PER_SITEMAP = 50000
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+
+
+class SitemapWriter:
+    """كاتب sitemap متدفق: يكتب كل <url> فور اكتشافه وينتقل إلى ملف جديد عند بلوغ الحدود
+
+    إذا انتهت الكتابة بملف واحد يُحفظ باسم output_file كالمعتاد، وإلا تُحفظ
+    الأجزاء باسم sitemap-N.xml ويُكتب sitemap_index.xml يشير إليها.
+    تُكتب الملفات أولاً إلى ملفات مؤقتة ولا تستبدل الملفات الحالية إلا إذا اختلف محتواها.
+    مع compress=True يُضغط التدفق بـ gzip أثناء الكتابة (sitemap.xml.gz وsitemap-N.xml.gz).
+    """
+
+    URLSET_OPEN = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<urlset xmlns="{SITEMAP_NS}" '
+        'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+        f'xsi:schemaLocation="{SITEMAP_NS} {SITEMAP_NS}/sitemap.xsd">\n'
+    ).encode('utf-8')
+    URLSET_CLOSE = b'</urlset>\n'
+
+    def __init__(self, output_file, base_url, index_file=None,
+                 max_urls=MAX_URLS_PER_SITEMAP, max_bytes=MAX_SITEMAP_BYTES, compress=False):
+        self.output_file = output_file
+        self.compress = compress
+        self.suffix = '.gz' if compress else ''
+        self.sitemap_file = output_file + self.suffix
+        self.base_url = base_url.rstrip('/')
+        directory = os.path.dirname(output_file)
+        stem, self.ext = os.path.splitext(os.path.basename(output_file))
+        self.shard_prefix = os.path.join(directory, stem + '-')
+        self.index_file = index_file or os.path.join(directory, stem + '_index' + self.ext)
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+        self.shards = []
+        self.changed_files = []
+        self.total_urls = 0
+        self._fh = None
+        self._raw = None
+        self._shard_lastmods = []
+        self._shard_urls = 0
+        self._shard_bytes = 0
+
+    def shard_path(self, number, suffix=None):
+        suffix = self.suffix if suffix is None else suffix
+        return f"{self.shard_prefix}{number}{self.ext}{suffix}"
+
+    def _open_shard(self):
+        path = self.shard_path(len(self.shards) + 1)
+        self.shards.append(path)
+        self._shard_lastmods.append('')
+        self._raw = open(path + '.tmp', 'wb')
+        if self.compress:
+            # mtime=0 وبدون اسم ملف في الترويسة حتى يبقى الناتج متطابقاً بين التشغيلات
+            self._fh = gzip.GzipFile(filename='', mode='wb', fileobj=self._raw, mtime=0)
+        else:
+            self._fh = self._raw
+        self._fh.write(self.URLSET_OPEN)
+        self._shard_urls = 0
+        self._shard_bytes = len(self.URLSET_OPEN)
+
+    def _close_shard(self):
+        if self._fh is not None:
+            self._fh.write(self.URLSET_CLOSE)
+            self._fh.close()
+            self._raw.close()
+            self._fh = self._raw = None
+
+    def add(self, loc, lastmod, changefreq, priority):
+        """كتابة سجل <url> واحد مع الانتقال لجزء جديد عند تجاوز 50,000 رابط أو 50MB"""
+        record = (
+            '  <url>\n'
+            f'    <loc>{escape(loc)}</loc>\n'
+            f'    <lastmod>{lastmod}</lastmod>\n'
+            f'    <changefreq>{changefreq}</changefreq>\n'
+            f'    <priority>{priority}</priority>\n'
+            '  </url>\n'
+        ).encode('utf-8')
+        if self._fh is None:
+            self._open_shard()
+        elif (self._shard_urls >= self.max_urls or
+              self._shard_bytes + len(record) + len(self.URLSET_CLOSE) > self.max_bytes):
+            self._close_shard()
+            self._open_shard()
+        self._fh.write(record)
+        self._shard_urls += 1
+        self._shard_bytes += len(record)
+        self._shard_lastmods[-1] = max(self._shard_lastmods[-1], lastmod)
+        self.total_urls += 1
+
+    def close(self):
+        """إغلاق الجزء الحالي وإرجاع قائمة الملفات الناتجة (sitemap واحد أو الفهرس مع أجزائه)"""
+        if self._fh is None:
+            self._open_shard()
+        self._close_shard()
+        shard_count = len(self.shards)
+        other_suffix = '' if self.compress else '.gz'
+        if shard_count == 1:
+            self._commit(self.shards[0] + '.tmp', self.sitemap_file)
+            self.shards = []
+            written = [self.sitemap_file]
+            stale = [self.index_file, self.output_file + other_suffix]
+        else:
+            for path in self.shards:
+                self._commit(path + '.tmp', path)
+            self.write_index()
+            written = [self.index_file] + self.shards
+            stale = [self.output_file, self.output_file + '.gz']
+        for path in stale:
+            if os.path.exists(path):
+                self._remove(path)
+        # حذف أجزاء تشغيل سابق كان أكبر (كلها إن لم يعد هناك تقسيم)، وأجزاء الوضع الآخر (مضغوط/غير مضغوط)
+        self._remove_stale_shards(1 if shard_count == 1 else shard_count + 1, self.suffix)
+        self._remove_stale_shards(1, other_suffix)
+        return written
+
+    def write_index(self):
+        """كتابة sitemap_index.xml يشير إلى جميع الأجزاء مع أحدث lastmod لكل جزء"""
+        tmp = self.index_file + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write(f'<sitemapindex xmlns="{SITEMAP_NS}">\n'.encode('utf-8'))
+            for path, lastmod in zip(self.shards, self._shard_lastmods):
+                loc = f"{self.base_url}/{urllib.parse.quote(os.path.basename(path), safe='/-_.')}"
+                f.write((
+                    '  <sitemap>\n'
+                    f'    <loc>{escape(loc)}</loc>\n'
+                    f'    <lastmod>{lastmod}</lastmod>\n'
+                    '  </sitemap>\n'
+                ).encode('utf-8'))
+            f.write(b'</sitemapindex>\n')
+        self._commit(tmp, self.index_file)
+
+    def _commit(self, tmp, path):
+        """استبدال الملف النهائي فقط إذا اختلف محتواه بايتاً ببايت"""
+        if os.path.exists(path) and filecmp.cmp(tmp, path, shallow=False):
+            os.remove(tmp)
+            return
+        os.replace(tmp, path)
+        self.changed_files.append(path)
+
+    def _remove(self, path):
+        os.remove(path)
+        self.changed_files.append(path)
+
+    def _remove_stale_shards(self, number, suffix):
+        """حذف أجزاء متبقية من تشغيل سابق بدءاً من الرقم number"""
+        while os.path.exists(self.shard_path(number, suffix)):
+            self._remove(self.shard_path(number, suffix))
+            number += 1
+
+
+class PageManifest:
+    """سجل دائم بجانب sitemap يحفظ لكل صفحة الحجم ووقت التعديل والبصمة والأولوية
+
+    يسمح بإعادة حساب الصفحات المضافة أو المعدلة فقط بدلاً من إعادة تصنيف الموقع كاملاً.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path, rules_key, load=True):
+        self.path = path
+        self.rules_key = rules_key
+        self.pages = {}
+        self.rules_changed = True
+        self._original = None
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._original = f.read()
+                data = json.loads(self._original)
+                if load and data.get('version') == self.VERSION:
+                    self.pages = data.get('pages', {})
+                    self.rules_changed = data.get('rules') != rules_key
+            except (OSError, ValueError) as e:
+                print(f"⚠️  تجاهل manifest غير صالح {path}: {e}")
+        self._seen = set()
+
+    def get(self, filename):
+        self._seen.add(filename)
+        return self.pages.get(filename)
+
+    def set(self, filename, entry):
+        self._seen.add(filename)
+        self.pages[filename] = entry
+
+    def prune(self):
+        """حذف الصفحات التي لم تعد موجودة وإرجاع أسمائها"""
+        removed = sorted(set(self.pages) - self._seen)
+        for filename in removed:
+            del self.pages[filename]
+        return removed
+
+    def save(self):
+        """حفظ manifest فقط إذا تغير محتواه"""
+        data = json.dumps({'version': self.VERSION, 'rules': self.rules_key, 'pages': self.pages},
+                          ensure_ascii=False, indent=1, sort_keys=True) + '\n'
+        if data == self._original:
+            return False
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+        self._original = data
+        return True
+
+
+class GitLastmodProvider:
+    """خريطة مسار -> تاريخ آخر commit مبنية من مرور واحد على git log --name-only
+
+    لا يُنشأ أي أمر فرعي لكل ملف: أمر rev-parse واحد وأمر log واحد وأمر status واحد
+    للتشغيل كله. الملفات المعدلة أو غير المتتبعة في شجرة العمل لا يُعاد لها تاريخ، وكذلك
+    الحال عند غياب git أو في نسخة shallow (حيث يبدو كل ملف معدلاً في آخر commit)،
+    فيعود المولد حينها إلى بصمة المحتوى المحفوظة في manifest.
+    """
+
+    def __init__(self, cwd='.', pathspecs=('*.html',)):
+        self.cwd = cwd
+        self.pathspecs = list(pathspecs)
+        self.dates = None
+        self.dirty = set()
+
+    def _git(self, *args):
+        return ['git', '-c', 'core.quotepath=off', *args]
+
+    def load(self):
+        """قراءة سجل git مرة واحدة؛ تُرجع False إذا لم يتوفر سجل صالح"""
+        self.dates = {}
+        try:
+            info = subprocess.run(self._git('rev-parse', '--is-shallow-repository', '--show-prefix'),
+                                  cwd=self.cwd, capture_output=True, text=True, check=True)
+            shallow, _, prefix = info.stdout.partition('\n')
+            if shallow.strip() == 'true':
+                print("⚠️  نسخة git سطحية (shallow): استخدام بصمات المحتوى بدلاً من تواريخ commit")
+                return False
+            prefix = prefix.strip()
+
+            # الأحدث أولاً: أول ظهور لمسار هو تاريخ آخر commit عدّله
+            cmd = self._git('log', '--relative', '--no-renames', '--name-only',
+                            '--date=short', '--format=%x00%cd', '--', *self.pathspecs)
+            with subprocess.Popen(cmd, cwd=self.cwd, stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL, encoding='utf-8') as proc:
+                current = None
+                for line in proc.stdout:
+                    line = line.rstrip('\n')
+                    if line.startswith('\x00'):
+                        current = line[1:]
+                    elif line and current and line not in self.dates:
+                        self.dates[line] = current
+            if proc.returncode != 0:
+                self.dates = {}
+                return False
+
+            # مسارات status نسبية لجذر المستودع، لذا نحذف بادئة المجلد الحالي
+            status = subprocess.run(self._git('status', '--porcelain', '-z', '--no-renames',
+                                              '--untracked-files=all', '--', *self.pathspecs),
+                                    cwd=self.cwd, capture_output=True, text=True, check=True)
+            for record in status.stdout.split('\0'):
+                path = record[3:]
+                if path and path.startswith(prefix):
+                    self.dirty.add(path[len(prefix):])
+        except (OSError, subprocess.CalledProcessError):
+            self.dates = {}
+            return False
+        return bool(self.dates)
+
+    def lastmod(self, path):
+        """تاريخ آخر commit للمسار أو None إذا لم يتوفر أو كان الملف معدلاً محلياً"""
+        if self.dates is None:
+            self.load()
+        path = os.path.normpath(path).replace(os.sep, '/')
+        if path in self.dirty:
+            return None
+        return self.dates.get(path)
+
+
+# صيغ W3C Datetime المقبولة في بروتوكول sitemaps
+W3C_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}(T\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:\d{2}))?$')
+
+
+@functools.lru_cache(maxsize=4096)
+def valid_w3c_date(text):
+    """التحقق من صيغة التاريخ وصحته؛ التواريخ تتكرر كثيراً لذا تُحفظ النتائج"""
+    if not W3C_DATE_RE.match(text):
+        return False
+    try:
+        datetime.strptime(text[:10], '%Y-%m-%d')
+    except ValueError:
+        return False
+    return True
+
+
+class SitemapValidator:
+    """مدقق sitemap متدفق يعتمد على iterparse ويفحص كل السجلات بذاكرة محدودة
+
+    يُفرَّغ كل عنصر <url> فور فحصه، وتُكشف الروابط المكررة عبر مجموعة من بصمات
+    blake2b بطول 8 بايت بدلاً من الاحتفاظ بنصوص الروابط. يدعم فهارس sitemap_index
+    بفحص كل جزء تشير إليه مع مشاركة مجموعة البصمات بين الأجزاء.
+    """
+
+    URL_TAG = f'{{{SITEMAP_NS}}}url'
+    SITEMAP_TAG = f'{{{SITEMAP_NS}}}sitemap'
+    LOC_TAG = f'{{{SITEMAP_NS}}}loc'
+    LASTMOD_TAG = f'{{{SITEMAP_NS}}}lastmod'
+    CHANGEFREQ_TAG = f'{{{SITEMAP_NS}}}changefreq'
+    PRIORITY_TAG = f'{{{SITEMAP_NS}}}priority'
+
+    # رابط مطلق مُرمَّز: أحرف ASCII المسموح بها فقط و% متبوعة بخانتين ست عشريتين
+    LOC_RE = re.compile(r"https?://(?:[A-Za-z0-9\-._~:/?#\[\]@!$&'()*+,;=]|%[0-9A-Fa-f]{2})+$")
+    CHANGEFREQS = {'always', 'hourly', 'daily', 'weekly', 'monthly', 'yearly', 'never'}
+    MAX_EXAMPLES = 5
+
+    def __init__(self, max_urls=MAX_URLS_PER_SITEMAP, max_bytes=MAX_SITEMAP_BYTES):
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+        self.seen = set()
+        self.url_count = 0
+        self.files = 0
+        self.priority_range = None
+        self.has_top_priority = False
+        self.errors = {}
+        self.examples = {}
+
+    def error(self, kind, detail):
+        # نحتفظ بأول بضعة أمثلة فقط لكل نوع حتى تبقى الذاكرة محدودة
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+        examples = self.examples.setdefault(kind, [])
+        if len(examples) < self.MAX_EXAMPLES:
+            examples.append(detail)
+
+    def check_loc(self, loc, where):
+        if not loc:
+            self.error('loc', f"{where}: <loc> فارغ")
+            return False
+        if not self.LOC_RE.match(loc):
+            self.error('loc', f"{where}: رابط غير مُرمَّز أو غير مطلق: {loc[:120]}")
+            return False
+        return True
+
+    def check_lastmod(self, lastmod, where):
+        if lastmod is not None and not valid_w3c_date(lastmod):
+            self.error('lastmod', f"{where}: تاريخ غير صحيح: {lastmod}")
+
+    def check_url(self, elem, where):
+        loc = (elem.findtext(self.LOC_TAG) or '').strip()
+        if self.check_loc(loc, where):
+            key = int.from_bytes(hashlib.blake2b(loc.encode('utf-8'), digest_size=8).digest(), 'big')
+            if key in self.seen:
+                self.error('duplicate', f"{where}: رابط مكرر: {loc[:120]}")
+            else:
+                self.seen.add(key)
+
+        self.check_lastmod(elem.findtext(self.LASTMOD_TAG), where)
+
+        changefreq = elem.findtext(self.CHANGEFREQ_TAG)
+        if changefreq is not None and changefreq.strip() not in self.CHANGEFREQS:
+            self.error('changefreq', f"{where}: قيمة changefreq غير صحيحة: {changefreq}")
+
+        priority = elem.findtext(self.PRIORITY_TAG)
+        if priority is not None:
+            try:
+                value = float(priority)
+            except ValueError:
+                value = None
+            if value is None or not 0.0 <= value <= 1.0:
+                self.error('priority', f"{where}: أولوية خارج النطاق 0.0-1.0: {priority}")
+            else:
+                low, high = self.priority_range or (value, value)
+                self.priority_range = (min(low, value), max(high, value))
+                self.has_top_priority = self.has_top_priority or value == 1.0
+
+    def validate_file(self, path, nested=False):
+        """فحص ملف واحد (urlset أو sitemapindex) بشكل متدفق؛ ملفات .gz تُفك أثناء القراءة"""
+        self.files += 1
+        compressed = path.endswith('.gz')
+        with (gzip.open(path, 'rb') if compressed else open(path, 'rb')) as source:
+            count, root, shards = self._parse(source, path, nested)
+            # حد 50MB في البروتوكول يخص الحجم غير المضغوط
+            file_size = source.tell()
+        if file_size > self.max_bytes:
+            self.error('size', f"{path}: الحجم {file_size:,} بايت يتجاوز حد 50MB")
+        if compressed:
+            file_size_text = f"{file_size:,} بايت غير مضغوط، {os.path.getsize(path):,} مضغوط"
+        else:
+            file_size_text = f"{file_size:,} بايت"
+
+        if count > self.max_urls:
+            self.error('count', f"{path}: {count:,} سجل يتجاوز حد 50,000")
+
+        if root is not None and root.tag.endswith('sitemapindex'):
+            print(f"🗂️  {path}: فهرس يشير إلى {count} جزء ({file_size_text})")
+            directory = os.path.dirname(path)
+            for loc in shards:
+                # الأجزاء تُخدم من نفس مجلد الفهرس
+                shard = os.path.join(directory, urllib.parse.unquote(urllib.parse.urlsplit(loc).path.rsplit('/', 1)[-1]))
+                if not os.path.exists(shard):
+                    self.error('shard', f"{path}: الجزء غير موجود محلياً: {shard}")
+                    continue
+                self.validate_file(shard, nested=True)
+        else:
+            self.url_count += count
+            print(f"✅ {path}: {count:,} رابط ({file_size_text})")
+
+    def _parse(self, source, path, nested):
+        count = 0
+        root = None
+        shards = []
+        for event, elem in ET.iterparse(source, events=('start', 'end')):
+            if root is None:
+                root = elem
+                if root.tag not in (f'{{{SITEMAP_NS}}}urlset', f'{{{SITEMAP_NS}}}sitemapindex'):
+                    self.error('namespace', f"{path}: عنصر جذر أو namespace غير متوقع: {root.tag}")
+                if nested and root.tag.endswith('sitemapindex'):
+                    self.error('namespace', f"{path}: فهرس داخل فهرس غير مسموح")
+                continue
+            if event != 'end':
+                continue
+            if elem.tag == self.URL_TAG:
+                count += 1
+                self.check_url(elem, f"{path}#{count}")
+                root.clear()
+            elif elem.tag == self.SITEMAP_TAG:
+                count += 1
+                loc = (elem.findtext(self.LOC_TAG) or '').strip()
+                if self.check_loc(loc, f"{path}#{count}"):
+                    shards.append(loc)
+                self.check_lastmod(elem.findtext(self.LASTMOD_TAG), f"{path}#{count}")
+                root.clear()
+        return count, root, shards
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+class PageClassifier:
+    """مصنف أسماء الصفحات المُجمَّع مرة واحدة لكل تشغيل
+
+    تُجمع كل الكلمات المفتاحية لجميع الفئات في تعبير نمطي واحد يُمرر على اسم الملف
+    مرة واحدة، مع تعبير منفصل لنطاق الحروف العربية، وتُحفظ النتائج في ذاكرة مؤقتة.
+    """
+
+    ARABIC_RE = re.compile('[\u0600-\u06FF]')
+    ARABIC_INFO = {'priority': '0.7', 'changefreq': 'weekly'}
+
+    def __init__(self, page_priorities, content_categories, fallback='general_articles'):
+        self.page_priorities = page_priorities
+        self.categories = []
+        self.keyword_rank = {}
+        for category, config in content_categories.items():
+            if not config['keywords']:
+                continue
+            rank = len(self.categories)
+            self.categories.append(
+                (category, {'priority': config['priority'], 'changefreq': config['changefreq']}))
+            for keyword in config['keywords']:
+                self.keyword_rank.setdefault(keyword.lower(), rank)
+        fallback_config = content_categories[fallback]
+        self.fallback = {'priority': fallback_config['priority'], 'changefreq': fallback_config['changefreq']}
+
+        # البدائل مرتبة حسب أولوية الفئة ثم الطول، لذا يُعاد عند كل موضع أعلى كلمة أولوية تبدأ منه
+        keywords = sorted(self.keyword_rank, key=lambda k: (self.keyword_rank[k], -len(k)))
+        self.keyword_re = re.compile('|'.join(re.escape(k) for k in keywords)) if keywords else None
+        self._cache = {}
+
+    def classify(self, filename):
+        """إرجاع (اسم الفئة، {'priority', 'changefreq'}) للملف مع حفظ النتيجة"""
+        result = self._cache.get(filename)
+        if result is None:
+            result = self._classify(filename)
+            self._cache[filename] = result
+        return result
+
+    def _classify(self, filename):
+        if filename in self.page_priorities:
+            return 'predefined', self.page_priorities[filename]
+
+        if self.keyword_re is not None:
+            name = filename.lower()
+            search = self.keyword_re.search
+            best = None
+            match = search(name)
+            while match is not None:
+                rank = self.keyword_rank[match.group()]
+                if best is None or rank < best:
+                    best = rank
+                    if rank == 0:
+                        break
+                # متابعة البحث من الحرف التالي حتى لا تُفوَّت كلمة متداخلة مع التطابق الحالي
+                match = search(name, match.start() + 1)
+            if best is not None:
+                return self.categories[best]
+
+        if self.ARABIC_RE.search(filename):
+            return 'arabic', self.ARABIC_INFO
+
+        return 'general', self.fallback
+
 
 class SitemapGenerator:
-    def __init__(self, base_url="https://zezooo342.github.io", output_file="sitemap.xml"):
+    def __init__(self, base_url="https://zezooo342.github.io", output_file="sitemap.xml",
+                 manifest_file=None, incremental=True, use_git=True, jobs=1,
+                 compress=False, robots_file="robots.txt"):
         self.base_url = base_url.rstrip('/')
         self.output_file = output_file
+        # manifest الصفحات يُحفظ بجانب sitemap (sitemap_manifest.json)
+        self.manifest_file = manifest_file or os.path.splitext(output_file)[0] + '_manifest.json'
+        self.incremental = incremental
+        # عدد الخيوط لفحص المجلدات على أنظمة الملفات البطيئة
+        self.jobs = jobs
+        # كتابة sitemap.xml.gz بدلاً من sitemap.xml (يُحدَّث robots.txt تلقائياً)
+        self.compress = compress
+        self.robots_file = robots_file
+        # مزود تواريخ lastmod من سجل git (يُقرأ بأمر git log واحد عند أول استخدام)
+        self.lastmod_provider = GitLastmodProvider() if use_git else None
         self.current_date = datetime.now().strftime('%Y-%m-%d')
         
         # تصنيف الصفحات وأولوياتها مع تحسينات احترافية
@@ -83,218 +607,206 @@ class SitemapGenerator:
             }
         }
         
-        # الملفات المستثناة من sitemap
-        self.excluded_files = ['404.html', 'index.html']  # استثناء index.html لأننا نضيف الصفحة الرئيسية يدوياً
+        # قواعد glob للملفات المضمنة والمستثناة من sitemap
+        self.include_patterns = ['*.html']
+        # استثناء /index.html في الجذر لأننا نضيف الصفحة الرئيسية يدوياً
+        self.exclude_patterns = list(DEFAULT_EXCLUDES) + ['404.html', '/index.html']
+        self._classifier = None
+
+    def rules_key(self):
+        """بصمة قواعد التصنيف؛ تغيرها يفرض إعادة تصنيف جميع الصفحات المحفوظة في manifest"""
+        rules = json.dumps([self.page_priorities, self.content_categories], sort_keys=True)
+        return hashlib.sha1(rules.encode('utf-8')).hexdigest()
+
+    def get_page_entry(self, filename, manifest, stats, page=None):
+        """إرجاع سجل الصفحة من manifest أو إعادة حسابه إذا أضيفت الصفحة أو تغير محتواها
+
+        يُؤخذ lastmod من تاريخ آخر commit للملف إن توفر سجل git، وإلا يُحتفظ بالتاريخ
+        السابق ما دامت بصمة المحتوى لم تتغير.
+        """
+        if page is None:
+            try:
+                st = os.stat(filename)
+            except OSError as e:
+                print(f"⚠️  استخدام التاريخ الحالي لـ {filename}: {e}")
+                page_info = self.get_page_info(filename)
+                return {'lastmod': self.current_date, 'priority': page_info['priority'],
+                        'changefreq': page_info['changefreq']}
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+        else:
+            # نتائج stat جُمعت أثناء المرور على الموقع
+            size, mtime_ns = page.size, page.mtime_ns
+
+        git_date = self.lastmod_provider.lastmod(filename) if self.lastmod_provider else None
+
+        entry = manifest.get(filename)
+        if entry is not None and not manifest.rules_changed:
+            if entry['size'] == size and entry['mtime'] == mtime_ns:
+                stats['unchanged'] += 1
+                if git_date:
+                    entry['lastmod'] = git_date
+                return entry
+
+        digest = DEFAULT_CACHE.content_sha1(filename, size, mtime_ns)
+        if entry is not None and entry['sha1'] == digest:
+            # المحتوى لم يتغير (مثل نسخة checkout جديدة): نحتفظ بـ lastmod السابق
+            stats['unchanged'] += 1
+            entry['mtime'] = mtime_ns
+            if git_date:
+                entry['lastmod'] = git_date
+            if manifest.rules_changed:
+                entry.update(self.get_page_info(filename))
+            return entry
+
+        page_info = self.get_page_info(filename)
+        lastmod_date = git_date or datetime.fromtimestamp(mtime_ns / 1e9).strftime('%Y-%m-%d')
+        stats['changed' if entry is not None else 'added'] += 1
+        entry = {
+            'size': size,
+            'mtime': mtime_ns,
+            'sha1': digest,
+            'lastmod': lastmod_date,
+            'priority': page_info['priority'],
+            'changefreq': page_info['changefreq'],
+        }
+        manifest.set(filename, entry)
+        print(f"📅 تاريخ {'آخر commit' if git_date else 'فعلي'} لـ {filename}: {lastmod_date}")
+        return entry
+
+    def iter_html_files(self):
+        """توليد ملفات HTML في الموقع كله (بما فيها المجلدات الفرعية) مع نتائج stat من نفس المرور"""
+        yield from walk_site('.', self.include_patterns, self.exclude_patterns, jobs=self.jobs)
 
     def get_html_files(self):
-        """الحصول على جميع ملفات HTML في الجذر"""
-        html_files = []
-        for file in glob.glob("*.html"):
-            if file not in self.excluded_files:
-                html_files.append(file)
-        return sorted(html_files)
+        """الحصول على جميع ملفات HTML في الموقع"""
+        return [page.path for page in self.iter_html_files()]
+
+    @property
+    def classifier(self):
+        """المصنف المُجمَّع؛ يُبنى مرة واحدة عند أول استخدام في التشغيل"""
+        if self._classifier is None:
+            self._classifier = PageClassifier(self.page_priorities, self.content_categories)
+        return self._classifier
 
     def get_page_info(self, filename):
         """الحصول على معلومات الصفحة مع تصنيف ذكي (الأولوية وتكرار التغيير)"""
-        # إذا كان الملف مُعرَّف مسبقاً، استخدم تلك المعلومات
-        if filename in self.page_priorities:
-            return self.page_priorities[filename]
-        
-        # تصنيف ذكي للمقالات بناءً على المحتوى والاسم
-        filename_lower = filename.lower()
-        
-        # فحص الكلمات المفتاحية للأولويات العالية
-        for category, config in self.content_categories.items():
-            if config['keywords']:  # تجنب الفئة العامة في هذه المرحلة
-                for keyword in config['keywords']:
-                    if keyword.lower() in filename_lower:
-                        print(f"📊 تصنيف ذكي: {filename} -> فئة {category} (أولوية: {config['priority']})")
-                        return {'priority': config['priority'], 'changefreq': config['changefreq']}
-        
-        # للملفات العربية، أعطها أولوية أعلى
-        if any(ord(char) >= 0x0600 and ord(char) <= 0x06FF for char in filename):
-            print(f"🔤 محتوى عربي: {filename} -> أولوية 0.7")
-            return {'priority': '0.7', 'changefreq': 'weekly'}
-        
-        # القيم الافتراضية للمقالات والصفحات الأخرى
-        return self.content_categories['general_articles']
+        return self.classifier.classify(filename)[1]
 
     def url_encode_filename(self, filename):
         """ترميز أسماء الملفات للحروف الخاصة والعربية"""
         return urllib.parse.quote(filename, safe='/-_')
 
     def generate_sitemap(self):
-        """توليد ملف sitemap.xml مع تحسينات احترافية"""
+        """توليد sitemap بشكل متدفق مع التقسيم التلقائي وإعادة حساب الصفحات المتغيرة فقط"""
         print("🔍 بدء فحص ملفات HTML مع التصنيف الذكي...")
-        
-        # إنشاء عنصر جذر XML مع المعايير الصحيحة
-        urlset = ET.Element('urlset')
-        urlset.set('xmlns', 'http://www.sitemaps.org/schemas/sitemap/0.9')
-        urlset.set('xmlns:xsi', 'http://www.w3.org/2001/XMLSchema-instance')
-        urlset.set('xsi:schemaLocation', 'http://www.sitemaps.org/schemas/sitemap/0.9 http://www.sitemaps.org/schemas/sitemap/0.9/sitemap.xsd')
 
-        # إضافة الصفحة الرئيسية (/) - دائماً الأولوية القصوى
-        print("🏠 إضافة الصفحة الرئيسية...")
-        url_element = ET.SubElement(urlset, 'url')
-        ET.SubElement(url_element, 'loc').text = f"{self.base_url}/"
-        ET.SubElement(url_element, 'lastmod').text = self.current_date
-        ET.SubElement(url_element, 'changefreq').text = 'daily'
-        ET.SubElement(url_element, 'priority').text = '1.0'
+        manifest = PageManifest(self.manifest_file, self.rules_key(), load=self.incremental)
+        stats = {'added': 0, 'changed': 0, 'unchanged': 0}
+        writer = SitemapWriter(self.output_file, self.base_url, compress=self.compress)
 
-        # الحصول على جميع ملفات HTML مع الفرز
-        html_files = self.get_html_files()
-        print(f"📄 تم العثور على {len(html_files)} ملف HTML")
+        # إضافة الصفحة الرئيسية (/) - دائماً الأولوية القصوى، وتاريخها من index.html
+        print("🏠 إضافة الصفحة الرئيسية...")
+        home_lastmod = self.current_date
+        if os.path.exists('index.html'):
+            home_lastmod = self.get_page_entry('index.html', manifest, stats)['lastmod']
+        writer.add(f"{self.base_url}/", home_lastmod, 'daily', '1.0')
 
         # تصنيف الملفات لإحصائيات أفضل
         priority_counts = {'1.0': 1, '0.9': 0, '0.8': 0, '0.7': 0, '0.6': 0, '0.5': 0}
-        
-        # إضافة كل ملف HTML إلى sitemap مع التصنيف المحسن
-        for filename in html_files:
-            page_info = self.get_page_info(filename)
-            encoded_filename = self.url_encode_filename(filename)
-            
-            url_element = ET.SubElement(urlset, 'url')
-            ET.SubElement(url_element, 'loc').text = f"{self.base_url}/{encoded_filename}"
-            
-            # استخدم وقت آخر تعديل فعلي للملف مع معالجة أفضل للأخطاء
-            try:
-                lastmod_date = datetime.fromtimestamp(os.path.getmtime(filename)).strftime('%Y-%m-%d')
-                print(f"📅 تاريخ فعلي لـ {filename}: {lastmod_date}")
-            except (OSError, FileNotFoundError) as e:
-                lastmod_date = self.current_date
-                print(f"⚠️  استخدام التاريخ الحالي لـ {filename}: {e}")
-                
-            ET.SubElement(url_element, 'lastmod').text = lastmod_date
-            ET.SubElement(url_element, 'changefreq').text = page_info['changefreq']
-            ET.SubElement(url_element, 'priority').text = page_info['priority']
-            
-            # تجميع إحصائيات الأولويات
-            priority_counts[page_info['priority']] = priority_counts.get(page_info['priority'], 0) + 1
-            
-            print(f"✅ تمت إضافة: {filename} (أولوية: {page_info['priority']}, تحديث: {page_info['changefreq']})")
 
-        # كتابة XML إلى ملف مع تحسينات التنسيق
-        tree = ET.ElementTree(urlset)
-        
-        # إضافة تنسيق جميل ومنسق للـ XML
-        self.indent(urlset)
-        
-        # كتابة الملف مع التصريح XML والترميز الصحيح
+        # كتابة كل ملف HTML فور اكتشافه دون الاحتفاظ بشجرة XML في الذاكرة
         try:
-            with open(self.output_file, 'w', encoding='utf-8') as f:
-                f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-                # تحويل إلى نص مع التنسيق الصحيح
-                xml_string = ET.tostring(urlset, encoding='unicode')
-                f.write(xml_string)
-            
-            print(f"🎉 تم إنشاء {self.output_file} بنجاح!")
-            print(f"📊 إجمالي الروابط: {len(html_files) + 1}")  # +1 للصفحة الرئيسية
-            
-            # طباعة إحصائيات الأولويات
-            print("\n📈 توزيع الأولويات:")
-            for priority, count in sorted(priority_counts.items(), key=lambda x: float(x[0]), reverse=True):
-                if count > 0:
-                    print(f"   أولوية {priority}: {count} صفحة")
-                    
+            for page in self.iter_html_files():
+                entry = self.get_page_entry(page.path, manifest, stats, page)
+                encoded_filename = self.url_encode_filename(page.path)
+
+                writer.add(f"{self.base_url}/{encoded_filename}", entry['lastmod'],
+                           entry['changefreq'], entry['priority'])
+
+                # تجميع إحصائيات الأولويات
+                priority_counts[entry['priority']] = priority_counts.get(entry['priority'], 0) + 1
+
+            self.written_files = writer.close()
         except Exception as e:
             print(f"❌ خطأ في كتابة الملف: {e}")
             raise
 
-    def indent(self, elem, level=0):
-        """إضافة مسافات لتنسيق XML مع ضمان تنسيق متسق"""
-        i = "\n" + level * "  "
-        if len(elem):
-            if not elem.text or not elem.text.strip():
-                elem.text = i + "  "
-            if not elem.tail or not elem.tail.strip():
-                elem.tail = i
-            for child in elem:
-                self.indent(child, level+1)
-            if not child.tail or not child.tail.strip():
-                child.tail = i
+        removed = manifest.prune()
+        manifest.save()
+        self.update_robots(self.written_files[0])
+        print(f"🔁 صفحات جديدة: {stats['added']}، معدلة: {stats['changed']}، "
+              f"محذوفة: {len(removed)}، دون تغيير: {stats['unchanged']}")
+
+        if not writer.changed_files:
+            print("✅ لا تغييرات: لم تتم إعادة كتابة sitemap")
+        elif writer.shards:
+            print(f"🎉 تم إنشاء {writer.index_file} مع {len(writer.shards)} جزء")
         else:
-            if level and (not elem.tail or not elem.tail.strip()):
-                elem.tail = i
-        # تنسيق العنصر الأخير
-        if level == 0:
-            elem.tail = "\n"
-
-    def validate_sitemap(self):
-        """التحقق المتقدم من صحة sitemap المولد"""
-        print("\n🔍 بدء التحقق المتقدم من sitemap...")
-        
-        if not os.path.exists(self.output_file):
+            print(f"🎉 تم إنشاء {writer.sitemap_file} بنجاح!")
+        print(f"📊 إجمالي الروابط: {writer.total_urls}")
+
+        # طباعة إحصائيات الأولويات
+        print("\n📈 توزيع الأولويات:")
+        for priority, count in sorted(priority_counts.items(), key=lambda x: float(x[0]), reverse=True):
+            if count > 0:
+                print(f"   أولوية {priority}: {count} صفحة")
+
+        return self.written_files
+
+    def update_robots(self, sitemap_path):
+        """توجيه سطر Sitemap وسطر Allow الخاص بالـ sitemap في robots.txt إلى الملف الناتج
+        (مضغوط أو فهرس) دون لمس بقية الأسطر"""
+        if not self.robots_file or not os.path.exists(self.robots_file):
+            return False
+        sitemap_path = urllib.parse.quote(os.path.relpath(sitemap_path).replace(os.sep, '/'), safe='/-_.')
+        sitemap_url = f"{self.base_url}/{sitemap_path}"
+        # كل أسماء الملف الممكنة: sitemap.xml و sitemap.xml.gz و sitemap_index.xml(.gz)
+        stem, ext = os.path.splitext(os.path.relpath(self.output_file).replace(os.sep, '/'))
+        allow_re = re.compile(rf"/{re.escape(stem)}(?:_index)?{re.escape(ext)}(?:\.gz)?")
+        with open(self.robots_file, encoding='utf-8') as f:
+            original = f.read()
+        lines = []
+        replaced = False
+        allow_replaced = False
+        for line in original.split('\n'):
+            if line.lower().startswith('sitemap:') and line.split(':', 1)[1].strip().startswith(self.base_url):
+                if replaced:
+                    continue
+                line = f"Sitemap: {sitemap_url}"
+                replaced = True
+            elif line.lower().startswith('allow:') and allow_re.fullmatch(line.split(':', 1)[1].strip()):
+                if allow_replaced:
+                    continue
+                line = f"Allow: /{sitemap_path}"
+                allow_replaced = True
+            lines.append(line)
+        if not replaced:
+            lines.append(f"Sitemap: {sitemap_url}")
+        content = '\n'.join(lines)
+        if content == original:
+            return False
+        with open(self.robots_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+        print(f"🤖 تم تحديث {self.robots_file}: Sitemap: {sitemap_url}")
+        return True
+
+    def validate_sitemap(self, path=None):
+        """التحقق المتدفق من كل سجلات sitemap المولد (أو فهرسه وجميع أجزائه)"""
+        if path is None:
+            stem, ext = os.path.splitext(self.output_file)
+            candidates = [self.output_file, self.output_file + '.gz', f"{stem}_index{ext}"]
+            if self.compress:
+                candidates.insert(0, candidates.pop(1))
+            path = next((c for c in candidates if os.path.exists(c)), self.output_file)
+        print(f"\n🔍 بدء التحقق المتقدم من {path}...")
+
+        if not os.path.exists(path):
             print("❌ خطأ: لم يتم إنشاء ملف sitemap")
             return False
-            
+
+        validator = SitemapValidator()
         try:
-            # قراءة وتحليل XML
-            tree = ET.parse(self.output_file)
-            root = tree.getroot()
-            
-            # التحقق من namespace
-            expected_ns = 'http://www.sitemaps.org/schemas/sitemap/0.9'
-            if root.tag != f'{{{expected_ns}}}urlset':
-                print(f"⚠️  تحذير: namespace غير متوقع في الجذر")
-            
-            urls = root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}url')
-            locs = root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}loc')
-            
-            print(f"✅ تم العثور على {len(urls)} URL في sitemap")
-            print(f"✅ تم العثور على {len(locs)} عنصر loc")
-            
-            # التحقق من الأولويات والصيغة
-            priorities = root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}priority')
-            priority_values = [float(p.text) for p in priorities if p.text]
-            
-            if priority_values:
-                print(f"📊 نطاق الأولويات: {min(priority_values):.1f} - {max(priority_values):.1f}")
-                
-                # التحقق من وجود أولوية 1.0 للصفحة الرئيسية
-                if 1.0 in priority_values:
-                    print("✅ الصفحة الرئيسية لها أولوية 1.0")
-                else:
-                    print("⚠️  تحذير: لا توجد صفحة بأولوية 1.0")
-            
-            # التحقق من تواريخ آخر تعديل
-            lastmods = root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}lastmod')
-            if lastmods:
-                print(f"✅ تم العثور على {len(lastmods)} تاريخ lastmod")
-                # التحقق من صيغة التاريخ
-                valid_dates = 0
-                for lastmod in lastmods[:5]:  # فحص أول 5 فقط لتوفير الوقت
-                    try:
-                        datetime.strptime(lastmod.text, '%Y-%m-%d')
-                        valid_dates += 1
-                    except ValueError:
-                        print(f"⚠️  تاريخ غير صحيح: {lastmod.text}")
-                
-                if valid_dates > 0:
-                    print(f"✅ صيغة التواريخ صحيحة (تم فحص {valid_dates}/{min(5, len(lastmods))})")
-            
-            # التحقق من حجم الملف
-            file_size = os.path.getsize(self.output_file)
-            print(f"📏 حجم الملف: {file_size:,} بايت")
-            
-            if file_size > 50 * 1024 * 1024:  # 50MB حد Google
-                print("⚠️  تحذير: حجم الملف كبير (أكثر من 50MB)")
-            elif file_size > 10 * 1024 * 1024:  # 10MB تحذير مبكر
-                print("⚠️  ملاحظة: حجم الملف كبير نسبياً (أكثر من 10MB)")
-            else:
-                print("✅ حجم الملف مناسب")
-            
-            # التحقق من الروابط المُكررة
-            loc_texts = [loc.text for loc in locs]
-            unique_locs = set(loc_texts)
-            if len(loc_texts) != len(unique_locs):
-                duplicates = len(loc_texts) - len(unique_locs)
-                print(f"⚠️  تحذير: {duplicates} رابط مُكرر")
-            else:
-                print("✅ لا توجد روابط مُكررة")
-            
-            print(f"🎯 إجمالي النتيجة: sitemap صحيح مع {len(urls)} رابط")
-            return True
-            
+            validator.validate_file(path)
         except ET.ParseError as e:
             print(f"❌ خطأ في تحليل XML: {e}")
             return False
@@ -302,22 +814,62 @@ class SitemapGenerator:
             print(f"❌ خطأ غير متوقع في التحقق: {e}")
             return False
 
+        if validator.priority_range:
+            low, high = validator.priority_range
+            print(f"📊 نطاق الأولويات: {low:.1f} - {high:.1f}")
+            if validator.has_top_priority:
+                print("✅ الصفحة الرئيسية لها أولوية 1.0")
+            else:
+                print("⚠️  تحذير: لا توجد صفحة بأولوية 1.0")
+
+        labels = {
+            'loc': 'روابط غير صالحة', 'duplicate': 'روابط مُكررة', 'lastmod': 'تواريخ غير صحيحة',
+            'priority': 'أولويات غير صحيحة', 'changefreq': 'قيم changefreq غير صحيحة',
+            'namespace': 'أخطاء namespace', 'count': 'ملفات تتجاوز عدد الروابط',
+            'size': 'ملفات تتجاوز الحجم', 'shard': 'أجزاء مفقودة',
+        }
+        for kind, count in validator.errors.items():
+            print(f"⚠️  {labels.get(kind, kind)}: {count}")
+            for example in validator.examples[kind]:
+                print(f"     - {example}")
+
+        if validator.ok:
+            print(f"✅ تم فحص جميع الروابط ({validator.url_count:,}) في {validator.files} ملف: "
+                  "التواريخ والأولويات والترميز صحيحة ولا توجد روابط مُكررة")
+            print(f"🎯 إجمالي النتيجة: sitemap صحيح مع {validator.url_count} رابط")
+        return validator.ok
+
 
 def main():
     """الدالة الرئيسية"""
     print("🚀 مولد sitemap.xml للموقع")
     print("=" * 40)
     
+    parser = argparse.ArgumentParser(description="توليد sitemap.xml للموقع")
+    parser.add_argument('--full', action='store_true',
+                        help="تجاهل manifest وإعادة حساب جميع الصفحات")
+    parser.add_argument('--no-git', action='store_true',
+                        help="عدم استخدام سجل git لتواريخ lastmod")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="عدد الخيوط لفحص المجلدات بالتوازي (لأنظمة الملفات البطيئة)")
+    parser.add_argument('--gzip', action='store_true',
+                        help="كتابة sitemap.xml.gz وأجزاء مضغوطة وتحديث robots.txt")
+    args = parser.parse_args()
+
     # إنشاء مولد sitemap
-    generator = SitemapGenerator()
+    generator = SitemapGenerator(incremental=not args.full, use_git=not args.no_git, jobs=args.jobs,
+                                 compress=args.gzip)
     
     # توليد sitemap
-    generator.generate_sitemap()
+    written = generator.generate_sitemap()
     
-    # التحقق من النتيجة
-    if generator.validate_sitemap():
-        print("\n✅ تم إنشاء sitemap.xml بنجاح!")
-        print("🔗 يمكنك الآن رفع الملف إلى الموقع")
+    # التحقق من النتيجة (الفهرس يتضمن فحص جميع أجزائه)
+    if generator.validate_sitemap(written[0]):
+        print(f"\n✅ تم إنشاء {written[0]} بنجاح!")
+        if len(written) > 1:
+            print(f"🔗 يمكنك الآن رفع الفهرس و{len(written) - 1} جزء إلى الموقع")
+        else:
+            print("🔗 يمكنك الآن رفع الملف إلى الموقع")
     else:
         print("\n❌ فشل في إنشاء sitemap صحيح")
 
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Composable HTML transform pipeline shared by the page-rewriting scripts.
+
+Each script registers its rewrite as a named transform. The pipeline reads
+every page once through the shared document cache (site_scan.DEFAULT_CACHE),
+runs the requested transforms in order on the in-memory text, and writes
+the page once (atomically, via a temp file and os.replace) only if some
+transform changed it. The original of every
+written page goes to the content-addressed backup store (backup_store.py)
+and is listed in one manifest per run. Pages can be processed on a process
+pool.
+
+A transform is `fn(page, context) -> str` returning the page's new text;
+`page.doc` is a SiteDocument parsed from the current text, and `context`
+is whatever the transform's optional `prepare(base)` hook returned once
+per run (it must be picklable when --jobs is used).
+"""
+from functools import partial
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import os
+
+from backup_store import BackupStore, atomic_write_text
+from site_scan import DEFAULT_CACHE, DEFAULT_EXCLUDES, SiteDocument, SiteFile, process_map, walk_site
+
+
+class Transform(NamedTuple):
+    name: str
+    fn: Callable
+    prepare: Optional[Callable] = None
+
+
+TRANSFORMS: Dict[str, Transform] = {}
+
+
+def register(name: str, prepare: Optional[Callable] = None):
+    """Decorator registering fn(page, context) -> str as a pipeline transform."""
+    def decorator(fn):
+        TRANSFORMS[name] = Transform(name, fn, prepare)
+        return fn
+    return decorator
+
+
+class Page:
+    """A page being transformed; doc is re-parsed lazily whenever text changes."""
+
+    def __init__(self, file: SiteFile, doc: SiteDocument):
+        self.file = file
+        self.path = file.path
+        self.full = file.full
+        self.original = doc.raw
+        self.text = doc.raw
+        self._doc = doc
+
+    @property
+    def doc(self) -> SiteDocument:
+        if self._doc is None or self._doc.raw != self.text:
+            self._doc = SiteDocument.from_text(self.text, self.full, self.file.mtime_ns)
+        return self._doc
+
+
+class PageResult(NamedTuple):
+    path: str
+    applied: Tuple[str, ...]
+    errors: Tuple[Tuple[str, str], ...]
+    backup: Optional[Dict[str, str]] = None
+
+
+def site_file(path, base='.') -> SiteFile:
+    """SiteFile for a single path (for scripts that accept one file instead of a directory)."""
+    st = os.stat(path)
+    rel = os.path.relpath(path, base).replace(os.sep, '/')
+    return SiteFile(rel, os.fspath(path), st.st_size, st.st_mtime_ns)
+
+
+def _run_page(f: SiteFile, steps: Sequence[Tuple[str, Callable, object]],
+              store: Optional[BackupStore]) -> PageResult:
+    try:
+        doc = DEFAULT_CACHE.get(f.full, f.size, f.mtime_ns)
+    except (OSError, UnicodeDecodeError) as e:
+        return PageResult(f.path, (), (('read', str(e)),))
+
+    page = Page(f, doc)
+    applied = []
+    errors = []
+    for name, fn, context in steps:
+        try:
+            new_text = fn(page, context)
+        except Exception as e:
+            errors.append((name, str(e)))
+            continue
+        if new_text is not None and new_text != page.text:
+            page.text = new_text
+            applied.append(name)
+
+    entry = None
+    if page.text != page.original:
+        try:
+            # Blobs are content-addressed, so workers can store them concurrently;
+            # the parent process records the returned entry in the run manifest
+            if store is not None:
+                entry = store.backup_entry(f.full)
+            atomic_write_text(f.full, page.text)
+        except OSError as e:
+            errors.append(('write', str(e)))
+            applied = []
+    return PageResult(f.path, tuple(applied), tuple(errors), entry)
+
+
+def run_pipeline(base='.', names: Sequence[str] = (), jobs: int = 1,
+                 files: Optional[Sequence[SiteFile]] = None, backup: bool = True) -> List[PageResult]:
+    """Run the named transforms over every page (or files) and return a result per page.
+
+    With backup, originals of the written pages are recorded as one run of
+    the backup store under base, restorable with `backup_store.py restore`.
+    """
+    unknown = [n for n in names if n not in TRANSFORMS]
+    if unknown:
+        raise KeyError(f"unknown transforms: {', '.join(unknown)}")
+    steps = []
+    for name in names:
+        transform = TRANSFORMS[name]
+        context = transform.prepare(base) if transform.prepare else None
+        steps.append((name, transform.fn, context))
+    if files is None:
+        files = list(walk_site(base, ('*.html',), DEFAULT_EXCLUDES))
+    store = BackupStore(base) if backup else None
+    results = list(process_map(partial(_run_page, steps=steps, store=store), files, jobs))
+    if store is not None:
+        with store.start_run('+'.join(names)) as run:
+            for result in results:
+                run.add(result.backup)
+    return results
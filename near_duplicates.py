@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Near-duplicate detection with word shingles, MinHash signatures and LSH banding.
+
+Text is tokenized with Arabic-aware normalization (diacritics and tatweel
+removed, alef/yaa/taa-marbuta variants folded) and split into overlapping
+word shingles. Each page is reduced to a fixed-size MinHash signature whose
+agreement rate estimates the Jaccard similarity of the shingle sets; LSH
+banding buckets signatures so that only pages sharing a band are compared,
+which keeps candidate generation roughly linear in the number of pages.
+
+The content index signs every page it (re)extracts, so signatures are only
+recomputed for new or changed pages between runs; update_signatures() fills
+in any page still missing one (for instance after the hasher settings changed).
+"""
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import hashlib
+import random
+import re
+
+from site_scan import get_document, process_map
+
+Signature = Tuple[int, ...]
+
+# Mersenne prime used for the universal hash family h(x) = (a*x + b) mod P
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_DIACRITICS_RE = re.compile(r'[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')
+_ARABIC_FOLD = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ى': 'ي', 'ة': 'ه', 'ؤ': 'و', 'ئ': 'ي'})
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens with Arabic orthographic variants folded together."""
+    text = _DIACRITICS_RE.sub('', text).translate(_ARABIC_FOLD).lower()
+    return _TOKEN_RE.findall(text)
+
+
+def shingles(tokens: Sequence[str], size: int = 5) -> Set[str]:
+    """Overlapping word n-grams; short texts yield a single shingle of all their tokens."""
+    if len(tokens) <= size:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def _hash64(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class MinHasher:
+    """Compute MinHash signatures; signatures are only comparable between hashers with equal settings."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rnd = random.Random(seed)
+        self._perms = [(rnd.randrange(1, _PRIME), rnd.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    @property
+    def key(self) -> str:
+        """Identifies the hash family, so stored signatures can be invalidated when settings change."""
+        return f"minhash:{self.num_perm}:{self.shingle_size}:{self.seed}"
+
+    def signature(self, text: str) -> Signature:
+        hashes = [_hash64(s) % _PRIME for s in shingles(tokenize(text), self.shingle_size)]
+        if not hashes:
+            return (_MAX_HASH,) * self.num_perm
+        return tuple(min((a * x + b) % _PRIME for x in hashes) & _MAX_HASH for a, b in self._perms)
+
+
+# Pages with less visible text than this are too short to compare meaningfully
+MIN_TEXT_CHARS = 100
+
+DEFAULT_HASHER = MinHasher()
+
+
+def text_signature(text: str, hasher: MinHasher = DEFAULT_HASHER) -> Optional[Signature]:
+    """Signature of visible text, or None if it is too short to compare."""
+    return hasher.signature(text) if len(text) > MIN_TEXT_CHARS else None
+
+
+def sign_file(path: str) -> Optional[Signature]:
+    """DEFAULT_HASHER signature of a page's visible text (module-level so it can run in worker processes)."""
+    try:
+        return text_signature(get_document(path).text)
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def update_signatures(index, base, jobs: int = 1) -> Tuple[Dict[str, Signature], Set[str]]:
+    """Sign pages of a refreshed ContentIndex whose content hash has no stored signature.
+
+    Returns ({path: signature} for every comparable page, paths signed by the
+    index's last refresh or by this call).
+    """
+    base = Path(base)
+    stored = index.signatures(DEFAULT_HASHER.key)
+    pending = [(row['path'], row['sha1']) for row in index.pages()
+               if row['path'] not in stored or stored[row['path']][0] != row['sha1']]
+    sigs = process_map(sign_file, [str(base / path) for path, _ in pending], jobs)
+    fresh = [(path, sha1, sig) for (path, sha1), sig in zip(pending, sigs)]
+    for path, sha1, sig in fresh:
+        stored[path] = (sha1, sig)
+    index.store_signatures(DEFAULT_HASHER.key, fresh)
+    signatures = {path: sig for path, (_, sig) in stored.items() if sig is not None}
+    return signatures, index.indexed | {path for path, _, _ in fresh}
+
+
+def estimate_jaccard(a: Signature, b: Signature) -> float:
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class LSHIndex:
+    """Band signatures into buckets; pages sharing any bucket become candidate pairs.
+
+    With b bands of r rows, pairs with Jaccard similarity s collide with
+    probability 1 - (1 - s**r)**b. The default 32x4 split catches pairs
+    above ~0.6 almost surely while rarely pairing unrelated pages.
+    """
+
+    def __init__(self, bands: int = 32, rows: int = 4):
+        self.bands = bands
+        self.rows = rows
+        self._buckets: Dict[Tuple[int, Signature], List[str]] = {}
+        self.signatures: Dict[str, Signature] = {}
+
+    def _band_keys(self, sig: Signature) -> Iterable[Tuple[int, Signature]]:
+        if len(sig) < self.bands * self.rows:
+            raise ValueError(f"signature has {len(sig)} values, need {self.bands * self.rows}")
+        for band in range(self.bands):
+            yield band, sig[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, key: str, sig: Signature):
+        self.signatures[key] = sig
+        for band_key in self._band_keys(sig):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def candidates(self, sig: Signature) -> Set[str]:
+        """Keys sharing at least one band with sig (not necessarily similar)."""
+        found: Set[str] = set()
+        for band_key in self._band_keys(sig):
+            found.update(self._buckets.get(band_key, ()))
+        return found
+
+    def candidate_pairs(self) -> Set[Tuple[str, str]]:
+        pairs = set()
+        for keys in self._buckets.values():
+            if len(keys) > 1:
+                keys = sorted(set(keys))
+                for i, a in enumerate(keys):
+                    for b in keys[i + 1:]:
+                        pairs.add((a, b))
+        return pairs
+
+    def query(self, sig: Signature, threshold: float, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Indexed keys whose estimated Jaccard similarity with sig is at least threshold."""
+        matches = []
+        for key in self.candidates(sig):
+            if key == exclude:
+                continue
+            ratio = estimate_jaccard(sig, self.signatures[key])
+            if ratio >= threshold:
+                matches.append((key, ratio))
+        return sorted(matches, key=lambda m: (-m[1], m[0]))
+
+
+def find_near_duplicates(signatures: Dict[str, Signature], threshold: float = 0.7,
+                         bands: int = 32, rows: int = 4) -> List[Dict[str, object]]:
+    """Pairs with estimated Jaccard >= threshold, in duplicate_report.json format ({'a', 'b', 'ratio'})."""
+    index = LSHIndex(bands, rows)
+    for key in sorted(signatures):
+        index.add(key, signatures[key])
+    duplicates = []
+    for a, b in sorted(index.candidate_pairs()):
+        ratio = estimate_jaccard(signatures[a], signatures[b])
+        if ratio >= threshold:
+            duplicates.append({'a': a, 'b': b, 'ratio': round(ratio, 2)})
+    return duplicates
+
+
+def find_duplicates_of(keys: Iterable[str], signatures: Dict[str, Signature], threshold: float = 0.7,
+                       bands: int = 32, rows: int = 4) -> List[Dict[str, object]]:
+    """Like find_near_duplicates, but only pairs involving one of keys (matched against every signature)."""
+    index = LSHIndex(bands, rows)
+    for key in sorted(signatures):
+        index.add(key, signatures[key])
+    pairs = {}
+    for key in keys:
+        if key not in signatures:
+            continue
+        for other, ratio in index.query(signatures[key], threshold, exclude=key):
+            pairs[tuple(sorted((key, other)))] = ratio
+    return [{'a': a, 'b': b, 'ratio': round(ratio, 2)} for (a, b), ratio in sorted(pairs.items())]
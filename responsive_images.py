@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Intrinsic image sizes and responsive variants for the site's <img> tags.
+
+image_size() reads width/height from the file header only (PNG, GIF, JPEG
+incl. EXIF orientation, WebP) without decoding pixels. build_variants()
+writes downscaled WebP and JPEG/PNG copies of an image at BREAKPOINTS into a
+`responsive/` directory next to it, keeping only those smaller than the
+source file. Variant file names (`<name>-<sha1>-<width>w.<ext>`, e.g.
+`logo.png-<sha1>-480w.webp`) and the per-image list of kept variants
+(`<name>-<sha1>.json`) embed the source's full file name and SHA-1, so an
+unchanged image is never re-encoded, files of an older version are removed,
+and logo.png and logo.jpg in one directory do not clash. GIFs get no
+variants (a static WebP/JPEG would replace an animation). Encoding needs
+Pillow; without it only sizes are available.
+"""
+from io import BytesIO
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+import hashlib
+import json
+import os
+import re
+import struct
+
+from backup_store import atomic_write_bytes, atomic_write_text
+from site_scan import DEFAULT_EXCLUDES, walk_site
+
+try:
+    from PIL import Image, ImageOps  # type: ignore
+except Exception:
+    Image = ImageOps = None
+
+IMAGE_PATTERNS = ('*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp')
+VARIANT_DIR = 'responsive'
+BREAKPOINTS = (480, 768, 1200)
+# Images smaller than this are placeholders or tracking pixels and are left alone
+MIN_DIMENSION = 16
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+# Characters left as-is when escaping an authored URL for srcset (',' and whitespace are escaped)
+URL_SAFE = "/:@!$&'()*+;=~%"
+
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class Variant(NamedTuple):
+    name: str       # file name inside VARIANT_DIR
+    width: int
+    mime: str
+
+
+class ImageInfo(NamedTuple):
+    width: int
+    height: int
+    variants: Tuple[Variant, ...] = ()
+
+
+def _exif_orientation(segment: bytes) -> int:
+    """Orientation tag from an APP1 Exif segment (1 if absent)."""
+    if not segment.startswith(b'Exif\0\0'):
+        return 1
+    tiff = segment[6:]
+    if len(tiff) < 8 or tiff[:2] not in (b'II', b'MM'):
+        return 1
+    e = '<' if tiff[:2] == b'II' else '>'
+    offset = struct.unpack(e + 'I', tiff[4:8])[0]
+    if offset + 2 > len(tiff):
+        return 1
+    count = struct.unpack(e + 'H', tiff[offset:offset + 2])[0]
+    for i in range(count):
+        entry = tiff[offset + 2 + 12 * i: offset + 14 + 12 * i]
+        if len(entry) < 12:
+            break
+        if struct.unpack(e + 'H', entry[:2])[0] == 0x0112:
+            return struct.unpack(e + 'H', entry[8:10])[0]
+    return 1
+
+
+def _jpeg_size(f) -> Optional[Tuple[int, int]]:
+    orientation = 1
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        while marker[1] == 0xFF:  # fill bytes
+            marker = marker[1:] + f.read(1)
+        kind = marker[1]
+        if kind in (0xD8, 0x01) or 0xD0 <= kind <= 0xD7:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if kind in _JPEG_SOF:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>HH', data[1:5])
+            # Browsers apply the EXIF orientation, so rotated images swap dimensions
+            return (height, width) if orientation >= 5 else (width, height)
+        if kind == 0xE1 and orientation == 1:
+            orientation = _exif_orientation(f.read(length - 2))
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def image_size(path) -> Optional[Tuple[int, int]]:
+    """(width, height) as displayed, read from the header only; None for unknown or broken files."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(32)
+            if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+                return struct.unpack('>II', head[16:24])
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack('<HH', head[6:10])
+            if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+                chunk = head[12:16]
+                if chunk == b'VP8 ' and len(head) >= 30:
+                    w, h = struct.unpack('<HH', head[26:30])
+                    return w & 0x3FFF, h & 0x3FFF
+                if chunk == b'VP8L' and len(head) >= 25:
+                    bits = int.from_bytes(head[21:25], 'little')
+                    return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+                if chunk == b'VP8X' and len(head) >= 30:
+                    return int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1
+                return None
+            if head.startswith(b'\xff\xd8'):
+                return _jpeg_size(f)
+    except (OSError, struct.error):
+        pass
+    return None
+
+
+def file_sha1(path) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _variant_re(name: str):
+    return re.compile(re.escape(name) + r'-([0-9a-f]{12})(?:-\d+w\.(?:webp|jpg|png)|\.json)')
+
+
+def build_variants(path, size: Tuple[int, int]) -> Tuple[Variant, ...]:
+    """Write (or reuse) WebP and JPEG/PNG variants of an image; () without Pillow, for GIFs or if none is smaller."""
+    src_dir, name = os.path.split(os.fspath(path))
+    stem, ext = os.path.splitext(name)
+    if Image is None or ext.lower() == '.gif':
+        return ()
+    width, height = size
+    widths = [w for w in BREAKPOINTS if w < width]
+    fallback = ('png', 'image/png') if ext.lower() == '.png' else ('jpg', 'image/jpeg')
+    out_dir = os.path.join(src_dir, VARIANT_DIR)
+    digest = file_sha1(path)[:12]
+
+    manifest = os.path.join(out_dir, f"{name}-{digest}.json")
+    if os.path.exists(manifest):
+        with open(manifest, encoding='utf-8') as f:
+            variants = tuple(Variant(*v) for v in json.load(f))
+    else:
+        planned = [(w, 'webp', 'image/webp') for w in widths + [width]]
+        planned += [(w, fallback[0], fallback[1]) for w in widths]
+        source_size = os.path.getsize(path)
+        kept = []
+        os.makedirs(out_dir, exist_ok=True)
+        with Image.open(path) as im:
+            im = ImageOps.exif_transpose(im)
+            for w, fmt, mime in planned:
+                scaled = im if w == width else im.resize((w, max(1, round(height * w / width))), Image.LANCZOS)
+                buf = BytesIO()
+                if mime == 'image/webp':
+                    scaled.save(buf, 'WEBP', quality=WEBP_QUALITY, method=6)
+                elif mime == 'image/jpeg':
+                    scaled.convert('RGB').save(buf, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+                else:
+                    scaled.save(buf, 'PNG', optimize=True)
+                if buf.tell() >= source_size:
+                    continue
+                v = Variant(f"{name}-{digest}-{w}w.{fmt}", w, mime)
+                atomic_write_bytes(os.path.join(out_dir, v.name), buf.getvalue())
+                kept.append(v)
+        variants = tuple(kept)
+        atomic_write_text(manifest, json.dumps([list(v) for v in variants]))
+
+    # Variants of earlier versions of this image are no longer referenced
+    if os.path.isdir(out_dir):
+        pattern = _variant_re(name)
+        for existing in os.listdir(out_dir):
+            m = pattern.fullmatch(existing)
+            if m and m.group(1) != digest:
+                os.unlink(os.path.join(out_dir, existing))
+    return variants
+
+
+def site_images(base='.', variants: bool = True) -> Dict[str, ImageInfo]:
+    """ImageInfo for every image under base, keyed by '/'-separated relative path."""
+    images = {}
+    for f in walk_site(base, IMAGE_PATTERNS, DEFAULT_EXCLUDES + (VARIANT_DIR,)):
+        size = image_size(f.full)
+        if size is None or min(size) < MIN_DIMENSION:
+            continue
+        built = build_variants(f.full, size) if variants else ()
+        images[f.path] = ImageInfo(size[0], size[1], built)
+    return images
+
+
+def srcset(prefix: str, info: ImageInfo, mime: str, original: Optional[str] = None) -> str:
+    """srcset value for the variants of one type; prefix is the directory part of the img src."""
+    # Spaces and commas would split a srcset candidate, so file names are percent-encoded
+    prefix = quote(prefix, safe=URL_SAFE)
+    items: List[str] = [f"{prefix}{VARIANT_DIR}/{quote(v.name)} {v.width}w"
+                        for v in info.variants if v.mime == mime]
+    if original is not None:
+        items.append(f"{quote(original, safe=URL_SAFE)} {info.width}w")
+    return ', '.join(items)
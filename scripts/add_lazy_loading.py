@@ -1,32 +1,128 @@
 #!/usr/bin/env python3
-"""Add loading="lazy" to <img> tags in HTML files (if missing). Creates .bak before changes."""
+"""Optimize <img> tags in HTML files. Originals go to the backup store.
+
+For every local image the pass adds, when missing:
+  - loading="lazy"
+  - width/height from the image header (prevents layout shift)
+  - srcset/sizes over downscaled JPEG/PNG variants, inside a <picture> with a
+    WebP <source> (needs Pillow; variants are cached by source hash, see
+    responsive_images.py)
+Markup generated by an earlier run is regenerated, so pages follow a changed
+image to its new variants (and the output is identical if nothing changed).
+
+Registered as the `lazy-loading` transform of html_pipeline; see scripts/transform_pages.py
+to run it together with the other page rewrites in one pass.
+
+Usage: python3 scripts/add_lazy_loading.py [directory] [--jobs N]
+"""
 from pathlib import Path
+from typing import Dict
+from urllib.parse import unquote
+import argparse
+import posixpath
 import re
 import sys
 
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from html_pipeline import register, run_pipeline  # noqa: E402
+from responsive_images import VARIANT_DIR, Image, ImageInfo, site_images, srcset  # noqa: E402
+
+IMG_RE = re.compile(r"<img\b([^>]*?)(\s*/?)>", re.IGNORECASE)
+ATTR_RE = re.compile(r"""([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?""")
+URL_SCHEME_RE = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*:")
+# <picture> wrappers written by this pass (see rewrite() below)
+GENERATED_RE = re.compile(r'<picture><source type="image/webp" srcset="([^"]*)" sizes="[^"]*">'
+                          r'(<img\b[^>]*?)(?: srcset="[^"]*" sizes="[^"]*")?(\s*/?>)</picture>')
+STYLE_SIZE_RE = re.compile(r"(?<![-\w])(?:width|height)\s*:", re.IGNORECASE)
+# Width of the article column in assets/css/enhanced.css
+CONTENT_WIDTH = 800
+
+
+def prepare_images(base) -> Dict[str, ImageInfo]:
+    if Image is None:
+        print('Pillow is not installed: adding image sizes only, no srcset variants')
+    return site_images(base)
+
 
-def process_file(p: Path):
-    text = p.read_text(encoding='utf-8')
-    new_text, n = re.subn(r"<img(?![^>]*loading=)([^>]*)>", lambda m: f"<img{m.group(1)} loading=\"lazy\">", text, flags=re.IGNORECASE)
-    if n:
-        bak = p.with_suffix(p.suffix + '.bak')
-        bak.write_text(text, encoding='utf-8')
-        p.write_text(new_text, encoding='utf-8')
-    return n
+def _attrs(attr_text: str) -> Dict[str, str]:
+    attrs = {}
+    for m in ATTR_RE.finditer(attr_text):
+        value = next((v for v in m.group(2, 3, 4) if v is not None), '')
+        attrs.setdefault(m.group(1).lower(), value)
+    return attrs
+
+
+def _resolve(page_path: str, src: str):
+    """Site-relative path of a local image src, or None for external/data URLs."""
+    if not src or src.startswith('//') or URL_SCHEME_RE.match(src):
+        return None
+    path = unquote(src.split('#', 1)[0].split('?', 1)[0])
+    if path.startswith('/'):
+        return posixpath.normpath(path.lstrip('/'))
+    return posixpath.normpath(posixpath.join(posixpath.dirname(page_path), path))
+
+
+@register('lazy-loading', prepare=prepare_images)
+def add_lazy_loading(page, context=None) -> str:
+    text = page.text
+    if '<img' not in text.lower():
+        return text
+    images = context or {}
+    if Image is not None and '<picture><source type="image/webp"' in text:
+        text = GENERATED_RE.sub(
+            lambda m: m.group(2) + m.group(3) if f'{VARIANT_DIR}/' in m.group(1) else m.group(0), text)
+    lower = text.lower()
+
+    def rewrite(m):
+        attr_text = m.group(1)
+        attrs = _attrs(attr_text)
+        extra = []
+        if 'loading' not in attrs:
+            extra.append('loading="lazy"')
+        src = attrs.get('src', '')
+        info = images.get(_resolve(page.path, src) or '')
+        wrap = False
+        if info is not None:
+            if ('width' not in attrs and 'height' not in attrs
+                    and not STYLE_SIZE_RE.search(attrs.get('style', ''))):
+                extra.append(f'width="{info.width}" height="{info.height}"')
+            in_picture = lower.rfind('<picture', 0, m.start()) > lower.rfind('</picture', 0, m.start())
+            if info.variants and 'srcset' not in attrs and '?' not in src and '#' not in src:
+                prefix = src[:src.rfind('/') + 1]
+                display = min(info.width, CONTENT_WIDTH)
+                sizes = f'(max-width: {display}px) 100vw, {display}px'
+                # Images narrower than every breakpoint only get a full-size WebP
+                fallback = next((v.mime for v in info.variants if v.mime != 'image/webp'), None)
+                if fallback:
+                    extra.append(f'srcset="{srcset(prefix, info, fallback, src)}" sizes="{sizes}"')
+                wrap = not in_picture
+        if not extra and not wrap:
+            return m.group(0)
+        tag = f"<img{attr_text}{''.join(' ' + e for e in extra)}{m.group(2)}>"
+        if wrap:
+            source = f'<source type="image/webp" srcset="{srcset(prefix, info, "image/webp")}" sizes="{sizes}">'
+            tag = f"<picture>{source}{tag}</picture>"
+        return tag
+
+    return IMG_RE.sub(rewrite, text)
 
 
 def main():
-    base = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('.')
-    total = 0
-    for p in base.glob('*.html'):
-        try:
-            n = process_file(p)
-            if n:
-                print(f"Updated {p.name}: {n} images")
-                total += n
-        except Exception as e:
-            print(f"Error processing {p}: {e}")
-    print(f"Total images updated: {total}")
+    parser = argparse.ArgumentParser(description='Add lazy loading, sizes and srcset to images')
+    parser.add_argument('base', nargs='?', default='.')
+    parser.add_argument('--jobs', type=int, default=1)
+    args = parser.parse_args()
+
+    updated = 0
+    for result in run_pipeline(args.base, ['lazy-loading'], args.jobs):
+        for step, error in result.errors:
+            print(f"Error processing {result.path}: {error}")
+        if result.applied:
+            print(f"Updated {result.path}")
+            updated += 1
+    print(f"Total files updated: {updated}")
 
 
 if __name__ == '__main__':
@@ -2,13 +2,23 @@
 """Automatically replace simple placeholder markers with short Arabic paragraphs.
 
 This is a conservative helper: it replaces occurrences of the exact string
-".... (أضف فقرة أصلية هنا)" with a brief, useful Arabic paragraph. It creates
-a .bak of each edited file.
+".... (أضف فقرة أصلية هنا)" with a brief, useful Arabic paragraph. The original
+of each edited file is kept in the backup store.
+
+Registered as the `fill-placeholders` transform of html_pipeline; see
+scripts/transform_pages.py to run it together with the other page rewrites.
+
+Usage: python3 scripts/auto_fill_placeholders.py [--jobs N]
 """
 from pathlib import Path
-import re
+import argparse
+import html
+import sys
 
 ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from html_pipeline import register, run_pipeline  # noqa: E402
 PLACEHOLDER = '.... (أضف فقرة أصلية هنا)'
 
 
@@ -21,41 +31,30 @@ def generate_paragraph(title: str) -> str:
     )
 
 
-def process_file(path: Path):
-    text = path.read_text(encoding='utf-8')
-    if PLACEHOLDER not in text:
-        return False
-    # backup
-    bak = path.with_suffix(path.suffix + '.bak')
-    if not bak.exists():
-        path.rename(bak)
-        content = bak.read_text(encoding='utf-8')
-    else:
-        content = path.read_text(encoding='utf-8')
+@register('fill-placeholders')
+def fill_placeholders(page, context=None) -> str:
+    if PLACEHOLDER not in page.text:
+        return page.text
 
     # try to infer a short title from the <h1> or file name
-    title_match = re.search(r'<h1>(.*?)</h1>', content, re.IGNORECASE | re.DOTALL)
-    if title_match:
-        title = title_match.group(1).strip()
-    else:
-        title = path.stem.replace('_', ' ')
+    title = html.escape(page.doc.h1, quote=False) or Path(page.path).stem.replace('_', ' ')
 
     new_par = generate_paragraph(title)
-    new_content = content.replace(PLACEHOLDER, new_par)
-    path.write_text(new_content, encoding='utf-8')
-    print(f"Updated: {path}")
-    return True
+    return page.text.replace(PLACEHOLDER, new_par)
 
 
 def main():
-    files = list(ROOT.glob('*.html'))
+    parser = argparse.ArgumentParser(description='Replace placeholder markers with short paragraphs')
+    parser.add_argument('--jobs', type=int, default=1)
+    args = parser.parse_args()
+
     changed = 0
-    for f in files:
-        try:
-            if process_file(f):
-                changed += 1
-        except Exception as e:
-            print(f"Error processing {f}: {e}")
+    for result in run_pipeline(ROOT, ['fill-placeholders'], args.jobs):
+        for step, error in result.errors:
+            print(f"Error processing {result.path}: {error}")
+        if result.applied:
+            print(f"Updated: {result.path}")
+            changed += 1
 
     print(f"Total files updated: {changed}")
 
@@ -3,16 +3,28 @@
 
 It reads `duplicate_report.json` (expected to be a list of pairs or a dict with 'pairs')
 and for each pair prepends a short unique sentence to the second file to make it
-less identical. Creates .bak backups before editing.
+less identical. Originals go to the backup store before editing.
+
+Registered as the `resolve-duplicates` transform of html_pipeline; see
+scripts/transform_pages.py to run it together with the other page rewrites.
+
+Usage: python3 scripts/auto_resolve_duplicates.py [--jobs N]
 """
-import json
 from pathlib import Path
+import argparse
+import json
+import sys
 
 ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from html_pipeline import register, run_pipeline  # noqa: E402
+
+NOTE = 'ملاحظة: هذه النسخة تحتوي على تحليل محدث وملاحظات حصرية تهدف لخدمة قراءنا بشكل أفضل.'
 
 
-def load_pairs():
-    p = ROOT / 'duplicate_report.json'
+def load_pairs(base=ROOT):
+    p = Path(base) / 'duplicate_report.json'
     if not p.exists():
         print('No duplicate_report.json found.')
         return []
@@ -22,57 +34,49 @@ def load_pairs():
     return data
 
 
-def make_backup(path: Path):
-    bak = path.with_suffix(path.suffix + '.bak')
-    if not bak.exists():
-        path.rename(bak)
-        path.write_text(bak.read_text(encoding='utf-8'), encoding='utf-8')
-        # restore original to path by copying content
+def second_pages(base=ROOT):
+    """Set of the second page of every flagged pair (the copy that gets the unique note)."""
+    targets = set()
+    for pair in load_pairs(base):
+        # pair could be tuple/list of two filenames or a dict
+        if isinstance(pair, dict):
+            b = pair.get('b')
+        elif isinstance(pair, (list, tuple)) and len(pair) >= 2:
+            b = pair[1]
+        else:
+            continue
+        if b:
+            targets.add(b)
+    return targets
 
 
-def prepend_unique(path: Path, note: str):
-    text = path.read_text(encoding='utf-8')
-    if note in text:
-        return False
-    new = f"<p class=\"unique-note\">{note}</p>\n" + text
-    # backup
-    bak = path.with_suffix(path.suffix + '.bak')
-    if not bak.exists():
-        bak.write_text(text, encoding='utf-8')
-    path.write_text(new, encoding='utf-8')
-    print(f"Prepended unique note to {path}")
-    return True
+@register('resolve-duplicates', prepare=second_pages)
+def prepend_unique(page, targets) -> str:
+    if page.path not in targets or NOTE in page.text:
+        return page.text
+    return f"<p class=\"unique-note\">{NOTE}</p>\n" + page.text
 
 
 def main():
-    pairs = load_pairs()
-    if not pairs:
+    parser = argparse.ArgumentParser(description='Prepend a unique note to flagged duplicate pages')
+    parser.add_argument('--jobs', type=int, default=1)
+    args = parser.parse_args()
+
+    targets = second_pages(ROOT)
+    if not targets:
         print('No pairs to process.')
         return
-    changed = 0
-    for pair in pairs:
-        # pair could be tuple/list of two filenames or a dict
-        if isinstance(pair, dict):
-            a = pair.get('a')
-            b = pair.get('b')
-        elif isinstance(pair, (list, tuple)):
-            if len(pair) >= 2:
-                a, b = pair[0], pair[1]
-            else:
-                continue
-        else:
-            continue
-
-        path_b = ROOT / b
-        if not path_b.exists():
+    for b in sorted(targets):
+        if not (ROOT / b).exists():
             print(f"File not found: {b}")
-            continue
-        note = 'ملاحظة: هذه النسخة تحتوي على تحليل محدث وملاحظات حصرية تهدف لخدمة قراءنا بشكل أفضل.'
-        try:
-            if prepend_unique(path_b, note):
-                changed += 1
-        except Exception as e:
-            print(f"Error editing {b}: {e}")
+
+    changed = 0
+    for result in run_pipeline(ROOT, ['resolve-duplicates'], args.jobs):
+        for step, error in result.errors:
+            print(f"Error editing {result.path}: {error}")
+        if result.applied:
+            print(f"Prepended unique note to {result.path}")
+            changed += 1
 
     print(f"Total duplicate files adjusted: {changed}")
 
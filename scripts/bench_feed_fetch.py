@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Benchmark concurrent feed fetching against a local stand-in HTTP server.
+
+Serves synthetic RSS and Atom fixture feeds from 127.0.0.1, each answered
+after an artificial delay, and times feeds.fetch_feeds with one worker
+(sequential, like the old loop) and with --jobs workers over one pooled
+session. The parsed entries of both runs are compared. It then runs twice
+more with a FeedCache: the second run revalidates with ETag/Last-Modified
+and gets 304s, so nothing is downloaded or parsed.
+
+The fixture helpers (rss_fixture, atom_fixture, FixtureServer) are reused by
+the other feed benchmarks.
+
+Usage: python3 scripts/bench_feed_fetch.py [--feeds N] [--delay SECONDS] [--jobs N]
+"""
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Tuple
+import argparse
+import hashlib
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from feeds import FeedCache, fetch_feeds, make_session  # noqa: E402
+
+
+def rss_fixture(items: int, name: str = 'feed') -> bytes:
+    body = ''.join(
+        f"<item><title>{name} headline {i}: markets, startups &amp; growth</title>"
+        f"<link>https://example.com/{name}/{i}</link><guid>{name}-{i}</guid>"
+        f"<description>&lt;p&gt;Summary {i} of {name} with enough text to be used as a topic.&lt;/p&gt;</description>"
+        f"<pubDate>Mon, 06 Jan 2025 10:{i % 60:02d}:00 GMT</pubDate></item>\n"
+        for i in range(items))
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel><title>{name}</title>'
+            f'<link>https://example.com/{name}</link><description>fixture</description>\n{body}'
+            '</channel></rss>\n').encode('utf-8')
+
+
+def atom_fixture(items: int, name: str = 'feed') -> bytes:
+    body = ''.join(
+        f'<entry><title>{name} entry {i}: investing and small business news</title>'
+        f'<link href="https://example.com/{name}/{i}"/><id>urn:{name}:{i}</id>'
+        f'<updated>2025-01-06T10:{i % 60:02d}:00Z</updated>'
+        f'<summary>Summary {i} of {name} with enough text to be used as a topic.</summary></entry>\n'
+        for i in range(items))
+    return (f'<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">'
+            f'<title>{name}</title><id>urn:{name}</id><updated>2025-01-06T10:00:00Z</updated>\n{body}'
+            '</feed>\n').encode('utf-8')
+
+
+class FixtureServer:
+    """Threaded HTTP server on 127.0.0.1 serving {path: (body, delay seconds)}; use as a context manager.
+
+    Responses carry an ETag and Last-Modified, and matching conditional
+    requests are answered with 304 Not Modified.
+    """
+
+    def __init__(self, feeds: Dict[str, Tuple[bytes, float]]):
+        self.feeds = feeds
+        self.requests = 0
+        self.not_modified = 0
+        self.last_modified = formatdate(usegmt=True)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client stopped reading after the entries it needed
+
+            def do_GET(self):
+                server.requests += 1
+                entry = server.feeds.get(self.path)
+                if entry is None:
+                    self.send_error(404)
+                    return
+                body, delay = entry
+                time.sleep(delay)
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+                if_none_match = self.headers.get('If-None-Match')
+                if (if_none_match == etag if if_none_match is not None
+                        else self.headers.get('If-Modified-Since') == server.last_modified):
+                    server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', server.last_modified)
+                self.send_header('Content-Type', 'application/rss+xml; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{path}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def entries_of(results):
+    return [[(e.title, e.link) for e in feed.entries] if feed is not None else repr(error)
+            for _, feed, error in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent feed fetching')
+    parser.add_argument('--feeds', type=int, default=12)
+    parser.add_argument('--delay', type=float, default=0.3, help='server delay per response')
+    parser.add_argument('--items', type=int, default=50, help='entries per feed')
+    parser.add_argument('--jobs', type=int, default=8)
+    args = parser.parse_args()
+
+    fixtures = {}
+    for i in range(args.feeds):
+        make = rss_fixture if i % 2 == 0 else atom_fixture
+        fixtures[f'/feed/{i}'] = (make(args.items, f'feed{i}'), args.delay)
+
+    with FixtureServer(fixtures) as server:
+        urls = [server.url(path) for path in fixtures]
+        timings = {}
+        outputs = {}
+        for jobs in (1, args.jobs):
+            session = make_session(jobs)
+            start = time.perf_counter()
+            results = fetch_feeds(urls, max_workers=jobs, session=session)
+            timings[jobs] = time.perf_counter() - start
+            outputs[jobs] = entries_of(results)
+            session.close()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FeedCache(tmp)
+            cached = {}
+            for run in ('cold', 'warm'):
+                before = server.not_modified
+                start = time.perf_counter()
+                results = fetch_feeds(urls, max_workers=args.jobs, cache=cache)
+                cached[run] = (time.perf_counter() - start, server.not_modified - before, entries_of(results))
+
+    print(f"{args.feeds} feeds, {args.delay:.2f}s server delay each")
+    print(f"sequential (1 worker):  {timings[1]:6.2f}s")
+    print(f"concurrent ({args.jobs} workers): {timings[args.jobs]:6.2f}s")
+    print(f"same entries: {outputs[1] == outputs[args.jobs]}")
+    for run, (elapsed, not_modified, _) in cached.items():
+        print(f"with cache, {run} run:   {elapsed:6.2f}s  ({not_modified} x 304)")
+    print(f"cached entries match: {cached['warm'][2] == cached['cold'][2] == outputs[1]}")
+
+
+if __name__ == '__main__':
+    main()
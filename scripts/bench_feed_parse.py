@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Benchmark the streaming feed parser of feeds.py against feedparser.
+
+Builds large RSS and Atom fixture feeds (see bench_feed_fetch.py) and times:
+  - feedparser.parse on the whole body (skipped if feedparser is missing)
+  - feeds.parse_feed on the whole body
+  - feeds.parse_feed stopping after --limit entries
+The parsed titles, links and ids are compared with feedparser's. It then
+serves the feeds from a local HTTP server and reports how many bytes are
+read over the network with and without the entry limit.
+
+Usage: python3 scripts/bench_feed_parse.py [--items N] [--limit N] [--repeat N]
+"""
+from pathlib import Path
+import argparse
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench_feed_fetch import FixtureServer, atom_fixture, rss_fixture  # noqa: E402
+from feeds import CHUNK_SIZE, _entry_record, make_session, parse_feed, read_feed  # noqa: E402
+
+try:
+    import feedparser  # type: ignore
+except Exception:
+    feedparser = None
+
+
+def best_of(repeat: int, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def keys(entries):
+    return [(e['title'], e['link'], e['id']) if isinstance(e, dict) else (e.title, e.link, e.id)
+            for e in entries]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming feed parsing')
+    parser.add_argument('--items', type=int, default=5000, help='entries per fixture feed')
+    parser.add_argument('--limit', type=int, default=3, help='entries needed per feed')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    fixtures = {'/rss': rss_fixture(args.items, 'rss'), '/atom': atom_fixture(args.items, 'atom')}
+    for path, body in fixtures.items():
+        print(f"{path[1:]}: {args.items} entries, {len(body) / 1024:.0f} KiB")
+        full_time, full = best_of(args.repeat, lambda: parse_feed(body))
+        head_time, head = best_of(args.repeat, lambda: parse_feed(body, args.limit))
+        if feedparser is not None:
+            fp_time, fp = best_of(args.repeat, lambda: [_entry_record(e) for e in feedparser.parse(body).entries])
+            print(f"  feedparser, all entries:        {fp_time * 1000:8.1f} ms")
+        print(f"  streaming, all entries:         {full_time * 1000:8.1f} ms")
+        print(f"  streaming, first {args.limit:<3} entries:    {head_time * 1000:8.1f} ms")
+        if feedparser is not None:
+            print(f"  same entries as feedparser: {keys(full.entries) == keys(fp)}"
+                  f" (first {args.limit}: {keys(head.entries) == keys(fp[:args.limit])})")
+
+    with FixtureServer({path: (body, 0.0) for path, body in fixtures.items()}) as server:
+        session = make_session(1)
+        for path in fixtures:
+            for limit in (None, args.limit):
+                start = time.perf_counter()
+                with session.get(server.url(path), stream=True) as resp:
+                    body, feed, _ = read_feed(resp.iter_content(CHUNK_SIZE), limit)
+                elapsed = time.perf_counter() - start
+                label = 'all entries' if limit is None else f'first {limit}'
+                print(f"fetch {path[1:]:<4} {label:<11}: {len(body) / 1024:8.0f} KiB read,"
+                      f" {len(feed.entries):5d} entries, {elapsed * 1000:7.1f} ms")
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
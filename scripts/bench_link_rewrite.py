@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Benchmark the one-pass link rewriter of sanitize_filenames.py.
+
+Builds a rename mapping and synthetic pages in memory (each page links to a
+mix of renamed and untouched files), then times:
+  - LinkRewriter.rewrite over every page
+  - the previous per-rename str.replace loop, on a sample of pages, with the
+    full-corpus time extrapolated from it (it is O(pages x renames))
+
+Usage: python3 scripts/bench_link_rewrite.py [--renames N] [--pages N] [--legacy-pages N]
+"""
+from pathlib import Path
+import argparse
+import random
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from sanitize_filenames import LinkRewriter  # noqa: E402
+
+
+def legacy_rewrite(text: str, mapping: dict) -> str:
+    for old, new in mapping.items():
+        text = text.replace(f'"{old}"', f'"{new}"')
+        text = text.replace(f"'{old}'", f"'{new}'")
+        text = text.replace(f'/{old}', f'/{new}')
+    return text
+
+
+def synthetic_page(rnd: random.Random, old_names, links: int = 40) -> str:
+    items = []
+    for i in range(links):
+        if rnd.random() < 0.2:
+            name = rnd.choice(old_names)
+        else:
+            name = f"stable_page_{rnd.randrange(100000)}.html"
+        href = rnd.choice([name, '/' + name])
+        items.append(f'<li><a href="{href}">مقال {i}</a> نص عربي قصير حول الموضوع.</li>')
+    return ('<!doctype html><html lang="ar" dir="rtl"><head><meta charset="utf-8">'
+            '<link rel="stylesheet" href="/assets/css/common.min.css"></head><body><ul>\n'
+            + '\n'.join(items) + '\n</ul><img src="/assets/img/logo.png" alt=""></body></html>\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark link rewriting')
+    parser.add_argument('--renames', type=int, default=10000)
+    parser.add_argument('--pages', type=int, default=10000)
+    parser.add_argument('--legacy-pages', type=int, default=20,
+                        help='pages to run the old per-rename loop on (extrapolated)')
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    mapping = {f"old page {i}'s notes.html": f"old_page_{i}_s_notes.html" for i in range(args.renames)}
+    old_names = list(mapping)
+    pages = [synthetic_page(rnd, old_names) for _ in range(args.pages)]
+    print(f"{args.renames} renames, {args.pages} pages, {sum(map(len, pages)) / 1e6:.1f}M chars")
+
+    start = time.perf_counter()
+    rewriter = LinkRewriter(mapping)
+    results = [rewriter.rewrite(page) for page in pages]
+    elapsed = time.perf_counter() - start
+    links = sum(count for _, count in results)
+    print(f"LinkRewriter:        {elapsed:8.2f}s  ({links} links rewritten)")
+
+    sample = pages[:args.legacy_pages]
+    start = time.perf_counter()
+    legacy = [legacy_rewrite(page, mapping) for page in sample]
+    elapsed_legacy = time.perf_counter() - start
+    estimate = elapsed_legacy / max(len(sample), 1) * len(pages)
+    print(f"str.replace loop:    {elapsed_legacy:8.2f}s for {len(sample)} pages "
+          f"(~{estimate:.2f}s for all {len(pages)})")
+
+    mismatches = sum(1 for (new, _), old in zip(results, legacy) if new != old)
+    print(f"Output mismatches on the sample: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Benchmark the precompiled sitemap PageClassifier against the old per-keyword loop.
+
+Builds a synthetic set of filenames (English keywords, Arabic names and plain
+slugs), checks that both implementations agree, then times each one.
+
+Usage: python3 scripts/bench_page_classifier.py [count]
+"""
+from pathlib import Path
+import random
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from generate_sitemap import PageClassifier, SitemapGenerator  # noqa: E402
+
+WORDS = ['how', 'to', 'grow', 'your', 'side', 'hustle', 'guide', 'tips', 'market',
+         'future', 'review', 'plan', 'saving', 'travel', 'health', 'remote', 'work']
+KEYWORD_WORDS = ['AI_Tools', 'Top_10', 'CEO', 'profit', 'Startup', 'Data', 'Tech', 'System']
+ARABIC_WORDS = ['الاستثمار', 'الربح', 'مشاريع', 'العملات', 'التسويق', 'تداول']
+
+
+def synthetic_filenames(count: int, seed: int = 42):
+    rnd = random.Random(seed)
+    names = []
+    for i in range(count):
+        kind = rnd.random()
+        if kind < 0.3:
+            parts = rnd.sample(WORDS, 3) + [rnd.choice(KEYWORD_WORDS)]
+            rnd.shuffle(parts)
+        elif kind < 0.5:
+            parts = rnd.sample(ARABIC_WORDS, 2)
+        else:
+            parts = rnd.sample(WORDS, 4)
+        names.append('_'.join(parts) + f'_{i}.html')
+    return names
+
+
+def legacy_page_info(gen: SitemapGenerator, filename: str):
+    """The original get_page_info loop, minus its per-file print calls."""
+    if filename in gen.page_priorities:
+        return gen.page_priorities[filename]
+    filename_lower = filename.lower()
+    for category, config in gen.content_categories.items():
+        if config['keywords']:
+            for keyword in config['keywords']:
+                if keyword.lower() in filename_lower:
+                    return {'priority': config['priority'], 'changefreq': config['changefreq']}
+    if any(ord(char) >= 0x0600 and ord(char) <= 0x06FF for char in filename):
+        return {'priority': '0.7', 'changefreq': 'weekly'}
+    general = gen.content_categories['general_articles']
+    return {'priority': general['priority'], 'changefreq': general['changefreq']}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    names = synthetic_filenames(count)
+    gen = SitemapGenerator()
+
+    legacy, t_legacy = timed(lambda: [legacy_page_info(gen, n) for n in names])
+
+    def compiled_run():
+        classifier = PageClassifier(gen.page_priorities, gen.content_categories)
+        return classifier, [classifier.classify(n)[1] for n in names]
+
+    (classifier, compiled), t_compiled = timed(compiled_run)
+    _, t_memo = timed(lambda: [classifier.classify(n)[1] for n in names])
+
+    mismatches = sum(1 for a, b in zip(legacy, compiled) if a != b)
+    print(f"Filenames:            {count:,}")
+    print(f"Legacy loop:          {t_legacy:.3f}s")
+    print(f"Compiled classifier:  {t_compiled:.3f}s ({t_legacy / t_compiled:.1f}x)")
+    print(f"Memoized re-run:      {t_memo:.3f}s ({t_legacy / t_memo:.1f}x)")
+    print(f"Mismatches:           {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Benchmark the stdlib visible-text extraction (SiteDocument.text) against BeautifulSoup and lxml.
+
+Writes a synthetic corpus of Arabic/English article pages (with nav, footer,
+scripts and styles) to a temporary directory, then times:
+  - site_scan.SiteDocument.text, sequentially and with a process pool (--jobs)
+  - BeautifulSoup with html.parser and lxml, if bs4/lxml are installed
+  - lxml.html text_content(), if lxml is installed
+
+Usage: python3 scripts/bench_text_extract.py [pages] [--jobs N]
+"""
+from importlib.util import find_spec
+from pathlib import Path
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from site_scan import SiteDocument, normalize_text, process_map  # noqa: E402
+
+WORDS = ['الاستثمار', 'الربح', 'مشاريع', 'العملات', 'التسويق', 'تداول', 'ﻣﺮﺣﺒﺎ', 'market',
+         'growth', 'profit', 'startup', 'guide', 'نصائح', 'الرقمية', 'الأعمال', 'النجاح']
+HIDDEN = ['script', 'style', 'noscript', 'template', 'nav', 'footer']
+
+
+def synthetic_page(rnd: random.Random, paragraphs: int = 30) -> str:
+    body = ''.join(f"<p>{' '.join(rnd.choices(WORDS, k=60))} &amp; <a href='/x.html'>رابط</a></p>\n"
+                   for _ in range(paragraphs))
+    return f"""<!DOCTYPE html>
+<html lang="ar" dir="rtl"><head><meta charset="UTF-8"><title>صفحة تجريبية</title>
+<style>body {{ font-family: sans-serif; }}</style>
+<script>var data = {{"a": 1}};</script></head>
+<body><nav><a href="/">الرئيسية</a> <a href="/about.html">من نحن</a></nav>
+<main><h1>عنوان المقال</h1>
+{body}</main>
+<footer>© 2025 جميع الحقوق محفوظة</footer>
+<script src="/assets/js/site-nav.min.js"></script></body></html>
+"""
+
+
+def document_text(path: str) -> str:
+    with open(path, 'rb') as f:
+        data = f.read()
+    return SiteDocument(path, data, len(data), 0).text
+
+
+def bs4_text(path: str, features: str) -> str:
+    from bs4 import BeautifulSoup
+    with open(path, encoding='utf-8') as f:
+        soup = BeautifulSoup(f.read(), features)
+    for tag in soup(HIDDEN + ['title']):
+        tag.decompose()
+    return normalize_text(soup.get_text(' '))
+
+
+def lxml_text(path: str) -> str:
+    import lxml.html
+    tree = lxml.html.parse(path)
+    for tag in tree.getroot().iter(*HIDDEN, 'title'):
+        tag.drop_tree()
+    return normalize_text(tree.getroot().text_content())
+
+
+def timed(label: str, fn, baseline=None):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    speed = f" ({baseline / elapsed:.2f}x the sequential site_scan speed)" if baseline else ''
+    print(f"{label:<32} {elapsed:.3f}s{speed}")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark visible-text extraction')
+    parser.add_argument('pages', nargs='?', type=int, default=2000)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.pages):
+            path = os.path.join(tmp, f'page_{i}.html')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(synthetic_page(rnd))
+            paths.append(path)
+        size = sum(os.path.getsize(p) for p in paths)
+        print(f"Corpus: {args.pages:,} pages, {size / 1e6:.1f} MB")
+
+        texts, t_seq = timed('site_scan (sequential)', lambda: [document_text(p) for p in paths])
+        pooled, _ = timed(f'site_scan (--jobs {args.jobs})',
+                          lambda: list(process_map(document_text, paths, args.jobs)), t_seq)
+        if pooled != texts:
+            print("Process-pool results differ from the sequential run")
+            sys.exit(1)
+
+        has_lxml = find_spec('lxml') is not None
+        if find_spec('bs4') is None:
+            print("BeautifulSoup not installed; skipping bs4 comparisons")
+        else:
+            timed('bs4 + html.parser', lambda: [bs4_text(p, 'html.parser') for p in paths], t_seq)
+            if has_lxml:
+                timed('bs4 + lxml', lambda: [bs4_text(p, 'lxml') for p in paths], t_seq)
+
+        if not has_lxml:
+            print("lxml not installed; skipping lxml comparison")
+        else:
+            timed('lxml.html', lambda: [lxml_text(p) for p in paths], t_seq)
+
+
+if __name__ == '__main__':
+    main()
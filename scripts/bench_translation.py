@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Benchmark the translation cache and batch API of translation.py.
+
+Uses a stand-in backend that sleeps --latency seconds per request (one
+request per translate_batch call), then times for --texts headlines:
+  - one translate() call per text with no cache (the old behaviour)
+  - one translate_many() call, cold cache
+  - the same call again on a later run, warm cache loaded from disk
+
+Usage: python3 scripts/bench_translation.py [--texts N] [--latency SECONDS]
+"""
+from pathlib import Path
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from translation import CachedTranslator, TranslationCache  # noqa: E402
+
+
+class SlowBackend:
+    """Prefixes texts with the target language after a fixed per-request delay."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def translate_batch(self, texts, dest):
+        time.sleep(self.latency)
+        return [f'[{dest}] {t}' for t in texts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark cached batch translation')
+    parser.add_argument('--texts', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.2, help='backend delay per request')
+    args = parser.parse_args()
+
+    texts = [f'Headline {i}: markets, startups and small business growth' for i in range(args.texts)]
+    backend = SlowBackend(args.latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'translations.json')
+        results = {}
+
+        start = time.perf_counter()
+        expected = [backend.translate_batch([t], 'ar')[0] for t in texts]
+        results['per text, no cache'] = (time.perf_counter() - start, len(texts))
+
+        for run in ('batch, cold cache', 'batch, warm cache'):
+            translator = CachedTranslator(backend, TranslationCache(path))
+            start = time.perf_counter()
+            out = translator.translate_many(texts)
+            results[run] = (time.perf_counter() - start, translator.backend_calls)
+            assert out == expected
+
+    print(f"{args.texts} texts, {args.latency:.2f}s backend latency per request")
+    for run, (elapsed, calls) in results.items():
+        print(f"{run:<20}: {elapsed:6.2f}s  ({calls} backend requests)")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,87 +4,110 @@
 This script runs the repository's placeholder and duplicate detectors and exits
 with a non-zero status if any placeholders or duplicates are detected. That
 prevents PR merges until human review.
+
+Both checks run in-process over one refresh of the content index
+(.cache/site_index.sqlite): every new or changed page is read and tokenized
+once, and its placeholder hits and MinHash signature come from that same
+document; unchanged pages are answered from the index. With
+--changed-since <git-ref>, only pages changed since that ref are checked for
+placeholders and reported as duplicates, but duplicates are still matched
+against every page of the site.
+
+Usage: python3 scripts/ci_content_quality.py [--changed-since REF] [--jobs N]
 """
-import json
+from pathlib import Path
+from typing import Optional, Set
+import argparse
+import os
 import subprocess
 import sys
-from pathlib import Path
-
 
 ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from content_index import DEFAULT_DB, ContentIndex  # noqa: E402
+from find_duplicates import write_report as write_duplicate_report  # noqa: E402
+from find_placeholders import write_report as write_placeholder_report  # noqa: E402
+from near_duplicates import find_duplicates_of, find_near_duplicates, update_signatures  # noqa: E402
+from site_scan import DEFAULT_EXCLUDES, walk_site  # noqa: E402
 
 
-def run(cmd):
-    print(f"Running: {cmd}")
-    res = subprocess.run(cmd, shell=True, cwd=ROOT)
+def _git(cmd) -> Optional[bytes]:
+    res = subprocess.run(cmd, cwd=ROOT, capture_output=True)
     if res.returncode != 0:
-        print(f"Command failed: {cmd}")
-    return res.returncode
+        print(f"Command failed: {' '.join(cmd)}: {res.stderr.decode(errors='replace').strip()}")
+        return None
+    return res.stdout
 
 
-def load_json(path: Path):
-    if not path.exists():
-        return None
-    try:
-        return json.loads(path.read_text(encoding='utf-8'))
-    except Exception as e:
-        print(f"Failed to read {path}: {e}")
+def changed_files(ref: str) -> Optional[Set[str]]:
+    """Paths (relative to ROOT) added/modified on this branch since it forked from ref,
+    including uncommitted and untracked files.
+
+    The diff starts at the merge base, so files changed on ref after the fork are not included.
+    """
+    base = _git(['git', 'merge-base', ref, 'HEAD'])
+    if base is None:
         return None
+    commands = [
+        ['git', 'diff', '--name-only', '-z', '--relative', '--no-renames', '--diff-filter=AM',
+         base.decode().strip(), '--'],
+        ['git', 'ls-files', '-z', '--others', '--exclude-standard'],
+    ]
+    paths = set()
+    for cmd in commands:
+        out = _git(cmd)
+        if out is None:
+            return None
+        paths.update(p for p in out.decode('utf-8').split('\0') if p)
+    return paths
+
+
+def run_checks(files, only, jobs):
+    """Refresh the content index once and return (placeholder report, duplicate pairs) from it."""
+    with ContentIndex(os.path.join(ROOT, DEFAULT_DB)) as index:
+        index.refresh(ROOT, jobs=jobs, files=files)
+        placeholders = index.placeholders(only)
+        signatures, _ = update_signatures(index, ROOT, jobs)
+    if only is None:
+        pairs = find_near_duplicates(signatures)
+    else:
+        pairs = find_duplicates_of(only, signatures)
+    write_placeholder_report(ROOT, placeholders)
+    write_duplicate_report(ROOT, pairs)
+    return placeholders, pairs
 
 
 def main():
-    # Run existing scripts if present
-    placeholders_script = ROOT / 'scripts' / 'find_placeholders.py'
-    duplicates_script = ROOT / 'scripts' / 'find_duplicates.py'
-
-    if placeholders_script.exists():
-        rc = run(f"python {placeholders_script}")
-        if rc != 0:
-            print('Placeholder script returned non-zero')
-
-    if duplicates_script.exists():
-        rc = run(f"python {duplicates_script}")
-        if rc != 0:
-            print('Duplicate script returned non-zero')
+    parser = argparse.ArgumentParser(description='Run content quality checks')
+    parser.add_argument('--changed-since', metavar='REF',
+                        help='only check pages changed since this git ref (e.g. origin/main)')
+    parser.add_argument('--jobs', type=int, default=1, help='worker processes for page extraction')
+    args = parser.parse_args()
+
+    site_files = list(walk_site(ROOT, ('*.html',), DEFAULT_EXCLUDES))
+    only = None
+    if args.changed_since:
+        changed = changed_files(args.changed_since)
+        if changed is None:
+            print('Could not determine changed files; checking the whole site')
+        else:
+            only = [f.path for f in site_files if f.path in changed]
+            print(f"Checking {len(only)} pages changed since {args.changed_since}")
 
-    placeholder_report = load_json(ROOT / 'placeholder_report.json')
-    duplicate_report = load_json(ROOT / 'duplicate_report.json')
+    placeholder_report, duplicate_report = run_checks(site_files, only, args.jobs)
 
     problems = 0
 
     if placeholder_report:
-        # placeholder_report may be a dict with 'files' key or a list
-        if isinstance(placeholder_report, dict):
-            files = placeholder_report.get('files') or placeholder_report.get('files_with_placeholders') or []
-            if not files:
-                # fallback: count keys/entries
-                try:
-                    files = list(placeholder_report)
-                except Exception:
-                    files = []
-        elif isinstance(placeholder_report, list):
-            files = placeholder_report
-        else:
-            files = []
-
-        total = len(files)
-        if total:
-            print(f"Found {total} files with placeholders. See placeholder_report.json")
-            problems += total
+        total = len(placeholder_report)
+        print(f"Found {total} files with placeholders. See placeholder_report.json")
+        problems += total
 
     if duplicate_report:
-        # duplicate_report may be a dict with 'pairs' or a list of pairs
-        if isinstance(duplicate_report, dict):
-            pairs = duplicate_report.get('pairs') or duplicate_report.get('duplicates') or []
-        elif isinstance(duplicate_report, list):
-            pairs = duplicate_report
-        else:
-            pairs = []
-
-        pairs_count = len(pairs)
-        if pairs_count:
-            print(f"Found {pairs_count} potential duplicate pairs. See duplicate_report.json")
-            problems += pairs_count
+        pairs_count = len(duplicate_report)
+        print(f"Found {pairs_count} potential duplicate pairs. See duplicate_report.json")
+        problems += pairs_count
 
     if problems:
         print("Content quality checks failed. Please fix placeholders/duplicates before merging.")
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 """Create HTML redirect pages for files that were renamed.
 
-For each file named NAME.html.bak, this script will create NAME.html (if missing)
-that redirects (meta refresh + link) to the sanitized filename produced by the
-sanitize_filenames script.
+For every rename recorded by sanitize_filenames in the backup store (and for
+legacy NAME.html.bak files left by older runs), this script creates the old
+NAME.html (if missing) that redirects (meta refresh + link) to the new name.
+Created pages are recorded as a backup-store run, so they can be removed with
+`python3 backup_store.py restore RUN_ID`.
 
 Usage: python3 scripts/create_redirects_from_bak.py [directory]
 """
@@ -11,6 +13,12 @@ from pathlib import Path
 import re
 import sys
 
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backup_store import BackupRun, BackupStore  # noqa: E402
+from site_scan import html_files  # noqa: E402
+
 
 def safe_name(name: str) -> str:
     # reuse the same renaming rules as sanitize_filenames
@@ -28,7 +36,7 @@ def safe_name(name: str) -> str:
     return s + ext
 
 
-def make_redirect(old_name: str, new_name: str, out_dir: Path):
+def make_redirect(old_name: str, new_name: str, out_dir: Path, run: BackupRun):
     content = f'''<!doctype html>
 <html lang="ar" dir="rtl">
 <head>
@@ -45,20 +53,34 @@ def make_redirect(old_name: str, new_name: str, out_dir: Path):
     out = out_dir / old_name
     if out.exists():
         return False
-    out.write_text(content, encoding='utf-8')
-    return True
+    return run.write_if_changed(out, content)
+
+
+def recorded_renames(store: BackupStore) -> dict:
+    """{old path: new path} for every rename in the store's runs (later runs win)."""
+    renames = {}
+    for run_id in store.run_ids():
+        for entry in store.load_run(run_id)['files']:
+            if entry['action'] == 'renamed':
+                renames[entry['path']] = entry['to']
+    return renames
 
 
 def main():
     base = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('.')
+    store = BackupStore(base)
+    renames = recorded_renames(store)
+    for bak in html_files(base, include=('*.html.bak',)):
+        old = bak.with_name(bak.name[:-4])  # strip .bak
+        renames.setdefault(old.relative_to(base).as_posix(), (bak.parent / safe_name(old.name)).relative_to(base).as_posix())
+
     created = []
-    for bak in base.glob('*.html.bak'):
-        old = bak.name[:-4]  # strip .bak
-        new = safe_name(old)
-        # if the sanitized file exists, create redirect at old
-        if (base / new).exists():
-            if make_redirect(old, new, base):
-                created.append((old, new))
+    with store.start_run('create-redirects') as run:
+        for old, new_url in sorted(renames.items()):
+            old_path = base / old
+            # only if the renamed file still exists; the redirect goes next to it
+            if (base / new_url).exists() and make_redirect(old_path.name, new_url, old_path.parent, run):
+                created.append((old, new_url))
 
     if created:
         for o, n in created:
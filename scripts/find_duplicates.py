@@ -1,47 +1,79 @@
 #!/usr/bin/env python3
-"""Detect simple near-duplicate HTML pages by comparing the first N characters of visible text."""
+"""Detect near-duplicate HTML pages with MinHash signatures and LSH banding.
+
+Every page's visible text is shingled into word 5-grams (Arabic-aware
+tokenization) and reduced to a MinHash signature; only pages that share an
+LSH band are compared, and pairs whose estimated Jaccard similarity reaches
+the threshold are written to duplicate_report.json as [{'a', 'b', 'ratio'}].
+
+Signatures are kept in the content index (.cache/site_index.sqlite) keyed by
+each page's SHA-1, so a run only fingerprints new or changed pages and
+matches them against the stored signatures; --full rebuilds them all.
+
+Text extraction and signing can run on a process pool with --jobs N.
+
+Usage: python3 scripts/find_duplicates.py [base] [--threshold 0.7] [--full] [--jobs N] [--db PATH]
+"""
 from pathlib import Path
-import re
-try:
-    from bs4 import BeautifulSoup
-except ImportError:
-    print("Error: The 'bs4' package is required to run this script. Please install it with 'pip install bs4'.", file=sys.stderr)
-    sys.exit(1)
+from typing import Iterable, Optional
+import argparse
+import os
 import sys
 import json
 
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from content_index import DEFAULT_DB, ContentIndex  # noqa: E402
+from near_duplicates import find_duplicates_of, find_near_duplicates, update_signatures  # noqa: E402
+from site_scan import SiteDocument  # noqa: E402
+
 
 def extract_text(html: str) -> str:
+    """Visible text of an HTML string (no script/style/nav/footer, normalized)."""
+    return SiteDocument.from_text(html).text
 
 
-def main():
-    base = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('.')
-    samples = {}
-    for p in base.glob('*.html'):
-        try:
-            text = p.read_text(encoding='utf-8')
-            visible = extract_text(text)[:1000]  # Take more content for comparison
-            if visible.strip() and len(visible) > 100:
-                samples[p.name] = visible
-        except Exception:
-            continue
-
-    duplicates = []
-    names = list(samples.keys())
-    for i in range(len(names)):
-        for j in range(i+1, len(names)):
-            a = samples[names[i]]
-            b = samples[names[j]]
-            if a and b:
-                # compute simple similarity
-                common = sum(1 for x,y in zip(a,b) if x==y)
-                ratio = common / max(len(a), len(b))
-                if ratio > 0.7:  # Lower threshold since we're comparing main content
-                    duplicates.append({'a': names[i], 'b': names[j], 'ratio': round(ratio,2)})
-
-    out = base / 'duplicate_report.json'
+def find_duplicates(base, threshold: float = 0.7, full: bool = False, jobs: int = 1,
+                    db: Optional[str] = None, only: Optional[Iterable[str]] = None, files=None):
+    """Refresh stored signatures and return (pairs, paths signed in this run).
+
+    With only, just the pairs involving those pages are returned, still
+    matched against every page of the site. files may pass in an existing
+    walk_site() result for base.
+    """
+    base = Path(base)
+    with ContentIndex(db or os.path.join(base, DEFAULT_DB)) as index:
+        if full:
+            index.clear_signatures()
+        index.refresh(base, full=full, jobs=jobs, files=files)
+        signatures, changed = update_signatures(index, base, jobs)
+    print(f"Fingerprinted {len(changed)} new/changed pages ({len(signatures)} signatures in the index)")
+    if only is None:
+        return find_near_duplicates(signatures, threshold), changed
+    return find_duplicates_of(only, signatures, threshold), changed
+
+
+def write_report(base, duplicates):
+    out = Path(base) / 'duplicate_report.json'
     out.write_text(json.dumps(duplicates, ensure_ascii=False, indent=2), encoding='utf-8')
-    print(f"Wrote duplicates: {len(duplicates)} pairs to {out}")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find near-duplicate pages')
+    parser.add_argument('base', nargs='?', default='.')
+    parser.add_argument('--threshold', type=float, default=0.7,
+                        help='minimum estimated Jaccard similarity to report (default: 0.7)')
+    parser.add_argument('--full', action='store_true', help='recompute every signature')
+    parser.add_argument('--jobs', type=int, default=1, help='worker processes for text extraction and signing')
+    parser.add_argument('--db', help=f'content index database (default: <base>/{DEFAULT_DB})')
+    args = parser.parse_args()
+
+    duplicates, changed = find_duplicates(args.base, args.threshold, args.full, args.jobs, args.db)
+    new_pairs = sum(1 for d in duplicates if d['a'] in changed or d['b'] in changed)
+    out = write_report(args.base, duplicates)
+    print(f"Wrote duplicates: {len(duplicates)} pairs ({new_pairs} involving changed pages) to {out}")
 
 
 if __name__ == '__main__':
@@ -1,39 +1,71 @@
 #!/usr/bin/env python3
 """Scan HTML files for placeholder markers and weak content indicators.
 Generates report `placeholder_report.json` listing files and matched lines.
+
+All patterns are compiled into one alternation and run once over each page;
+line numbers come from a newline-offset table that is only built for pages
+with a match. Pages are read through the shared document cache (files of
+MMAP_THRESHOLD bytes or more are mmap'd instead), and can be scanned on a
+process pool.
+
+Usage: python3 scripts/find_placeholders.py [base] [--jobs N]
+                                           [--patterns FILE] [--pattern REGEX ...]
 """
+from functools import partial
 from pathlib import Path
-import re
+from typing import Optional, Sequence
+import argparse
 import json
 import sys
 
-PLACEHOLDER_PATTERNS = [
-    r"\.{4,}\s*\(أضف فقرة أصلية هنا\)",
-    r"أضف\s+فقرة",
-]
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
 
+from site_scan import (DEFAULT_CACHE, DEFAULT_EXCLUDES, MMAP_THRESHOLD, PLACEHOLDER_PATTERNS,  # noqa: E402
+                       PlaceholderScanner, SiteFile, load_patterns, process_map, walk_site)
 
-def scan_dir(base: Path):
-    report = {}
-    patterns = [re.compile(p, flags=re.IGNORECASE | re.UNICODE) for p in PLACEHOLDER_PATTERNS]
-    for p in base.glob('*.html'):
-        text = p.read_text(encoding='utf-8')
-        matches = []
-        for i, line in enumerate(text.splitlines(), 1):
-            for pat in patterns:
-                if pat.search(line):
-                    matches.append({'line': i, 'text': line.strip()})
-                    break
-        if matches:
-            report[p.name] = matches
-    return report
 
+def scan_page(f: SiteFile, scanner: Optional[PlaceholderScanner] = None):
+    """Hits for one page; scanner None means the built-in patterns (the document's cached placeholder_hits)."""
+    if f.size >= MMAP_THRESHOLD:
+        return (scanner or PlaceholderScanner()).scan_file(f.full)
+    doc = DEFAULT_CACHE.get(f.full, f.size, f.mtime_ns)
+    return doc.placeholder_hits if scanner is None else scanner.scan_text(doc.raw)
 
-def main():
-    base = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('.')
-    report = scan_dir(base)
-    out = base / 'placeholder_report.json'
+
+def scan_files(files: Sequence, scanner: Optional[PlaceholderScanner] = None, jobs: int = 1):
+    """Placeholder hits for SiteFiles, as {relative path: [{'line', 'text'}]} (files without hits omitted)."""
+    results = process_map(partial(scan_page, scanner=scanner), files, jobs)
+    return {f.path: hits for f, hits in zip(files, results) if hits}
+
+
+def scan_dir(base: Path, scanner: Optional[PlaceholderScanner] = None, jobs: int = 1):
+    return scan_files(list(walk_site(base, ('*.html',), DEFAULT_EXCLUDES)), scanner, jobs)
+
+
+def write_report(base, report):
+    out = Path(base) / 'placeholder_report.json'
     out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find placeholder markers in HTML pages')
+    parser.add_argument('base', nargs='?', default='.')
+    parser.add_argument('--jobs', type=int, default=1, help='worker processes')
+    parser.add_argument('--patterns', metavar='FILE',
+                        help='file with one regex per line (replaces the built-in patterns)')
+    parser.add_argument('--pattern', action='append', default=[], metavar='REGEX',
+                        help='extra pattern to search for (repeatable)')
+    args = parser.parse_args()
+
+    base = Path(args.base)
+    scanner = None
+    if args.patterns or args.pattern:
+        patterns = load_patterns(args.patterns) if args.patterns else list(PLACEHOLDER_PATTERNS)
+        scanner = PlaceholderScanner(patterns + args.pattern)
+    report = scan_dir(base, scanner, args.jobs)
+    out = write_report(base, report)
     print(f"Wrote report: {out} ({len(report)} files)")
 
 
@@ -1,52 +1,52 @@
 #!/usr/bin/env python3
 """Script: إصلاح رؤوس صفحات HTML المفقودة (DOCTYPE, head charset, html lang/dir)
-ينسخ الملفات الأصلية إلى ملف بلاحقة .bak ثم يضيف ترويسة HTML إذا كانت مفقودة.
-Usage: python scripts/fix_html_headers.py [path]
+يحفظ الملفات الأصلية في مخزن النسخ الاحتياطية (backup_store.py) ثم يضيف ترويسة HTML إذا كانت مفقودة.
+مسجل كتحويل `fix-headers` في html_pipeline (راجع scripts/transform_pages.py).
+Usage: python scripts/fix_html_headers.py [path] [--jobs N]
 If path omitted, fixes .html files in repository root.
 """
 from pathlib import Path
+import argparse
 import sys
 
-TEMPLATE_HEAD = ("<!doctype html>\n<html lang=\"ar\" dir=\"rtl\">\n<head>\n  <meta charset=\"utf-8\">\n  <meta name=\"viewport\" content=\"width=device-width,initial-scale=1\">\n</head>\n<body>\n")
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
 
-TEMPLATE_FOOT = "\n</body>\n</html>\n"
+from html_pipeline import register, run_pipeline, site_file  # noqa: E402
 
+TEMPLATE_HEAD = ("<!doctype html>\n<html lang=\"ar\" dir=\"rtl\">\n<head>\n  <meta charset=\"utf-8\">\n  <meta name=\"viewport\" content=\"width=device-width,initial-scale=1\">\n</head>\n<body>\n")
 
-def is_fragment(content: str) -> bool:
-    """Return True if the file looks like an HTML fragment (missing <html> or <!doctype>)."""
-    low = content.lower()
-    return not ("<!doctype" in low or "<html" in low)
+TEMPLATE_FOOT = "\n</body>\n</html>\n"
 
 
-def fix_file(path: Path) -> bool:
-    text = path.read_text(encoding="utf-8")
-    if not is_fragment(text):
-        return False
-    bak = path.with_suffix(path.suffix + ".bak")
-    bak.write_text(text, encoding="utf-8")
-    new_text = TEMPLATE_HEAD + text + TEMPLATE_FOOT
-    path.write_text(new_text, encoding="utf-8")
-    return True
+@register('fix-headers')
+def fix_headers(page, context=None) -> str:
+    if not page.doc.is_fragment:
+        return page.text
+    return TEMPLATE_HEAD + page.text + TEMPLATE_FOOT
 
 
 def main():
-    base = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('.')
-    files = []
+    parser = argparse.ArgumentParser(description='Wrap HTML fragments in a full document')
+    parser.add_argument('path', nargs='?', default='.')
+    parser.add_argument('--jobs', type=int, default=1)
+    args = parser.parse_args()
+
+    base = Path(args.path)
     if base.is_dir():
-        files = list(base.glob('*.html'))
+        results = run_pipeline(base, ['fix-headers'], args.jobs)
     elif base.is_file():
-        files = [base]
+        results = run_pipeline(base.parent, ['fix-headers'], files=[site_file(base, base.parent)])
     else:
         print("Path not found:", base)
         return
 
     fixed = []
-    for f in files:
-        try:
-            if fix_file(f):
-                fixed.append(f.name)
-        except Exception as e:
-            print(f"Failed to fix {f}: {e}")
+    for result in results:
+        for step, error in result.errors:
+            print(f"Failed to fix {result.path}: {error}")
+        if result.applied:
+            fixed.append(result.path)
 
     if fixed:
         print("Fixed files:", ", ".join(fixed))
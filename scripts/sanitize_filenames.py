@@ -1,14 +1,31 @@
 #!/usr/bin/env python3
 """Rename unsafe filenames (spaces, apostrophes, special chars) to web-safe names
-and update internal links in HTML files. Creates .bak backups of changed files.
+and update internal links in HTML files. Renames and the originals of edited
+files are recorded in the backup store, so a run can be undone with
+`python3 backup_store.py restore RUN_ID`.
+
+Links are rewritten by LinkRewriter in one scan per file: every href/src
+value is matched by a single regex, resolved against the linking page's
+directory and looked up in the rename mapping (keyed by site-relative
+path), so the cost does not grow with the number of renames. Links with a
+scheme or host (external sites, mailto:) are never touched.
 
 Usage: python scripts/sanitize_filenames.py [directory]
 If no directory is given, uses repository root.
 """
 from pathlib import Path
+from typing import Dict, Tuple
+from urllib.parse import unquote
+import posixpath
 import re
 import sys
 
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backup_store import BackupRun, BackupStore  # noqa: E402
+from site_scan import get_document, html_files  # noqa: E402
+
 
 def safe_name(name: str) -> str:
     # keep extension
@@ -28,27 +45,78 @@ def safe_name(name: str) -> str:
     return s + ext
 
 
-def update_links_in_file(path: Path, mapping: dict):
-    text = path.read_text(encoding='utf-8')
-    original = text
-    for old, new in mapping.items():
-        # replace href="old" and href='old' and plain occurrences
-        text = text.replace(f'"{old}"', f'"{new}"')
-        text = text.replace(f"'{old}'", f"'{new}'")
-        # also replace /old and /old
-        text = text.replace(f'/{old}', f'/{new}')
-    if text != original:
-        bak = path.with_suffix(path.suffix + '.bak')
-        bak.write_text(original, encoding='utf-8')
-        path.write_text(text, encoding='utf-8')
-        return True
-    return False
+# href/src attribute values, double-quoted, single-quoted or bare
+LINK_ATTR_RE = re.compile(
+    r"""(\b(?:href|src)\s*=\s*)(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+))""", re.IGNORECASE)
+URL_SCHEME_RE = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*:")
+
+
+class LinkRewriter:
+    """Rewrite links to renamed files in one pass over a page.
+
+    The mapping is {old site-relative path: new site-relative path}, '/'-separated
+    (renames stay in the same directory). Each link's path (before any ?query
+    or #fragment, percent-decoded) is resolved against the linking page's
+    directory, or the site root for /-absolute links, and looked up; only the
+    file name in the link is replaced, the rest of the URL is kept as written.
+    """
+
+    def __init__(self, mapping: Dict[str, str]):
+        self.mapping = dict(mapping)
+
+    def _rewrite_url(self, url: str, page_dir: str) -> str:
+        if url.startswith('//') or URL_SCHEME_RE.match(url):
+            return url
+        end = len(url)
+        for sep in '?#':
+            i = url.find(sep)
+            if i != -1 and i < end:
+                end = i
+        path = unquote(url[:end])
+        if not path:
+            return url
+        if path.startswith('/'):
+            target = posixpath.normpath(path.lstrip('/'))
+        else:
+            target = posixpath.normpath(posixpath.join(page_dir, path))
+        new = self.mapping.get(target)
+        if new is None:
+            return url
+        start = url.rfind('/', 0, end) + 1
+        return url[:start] + posixpath.basename(new) + url[end:]
+
+    def rewrite(self, text: str, page_path: str = '') -> Tuple[str, int]:
+        """Return (new text, number of links rewritten); page_path is the page's site-relative path."""
+        page_dir = posixpath.dirname(page_path)
+        count = 0
+
+        def replace(m):
+            nonlocal count
+            dq, sq, bare = m.group(2, 3, 4)
+            url = dq if dq is not None else sq if sq is not None else bare
+            new = self._rewrite_url(url, page_dir)
+            if new == url:
+                return m.group(0)
+            count += 1
+            quote = '"' if dq is not None else "'" if sq is not None else ''
+            return f"{m.group(1)}{quote}{new}{quote}"
+
+        return LINK_ATTR_RE.sub(replace, text), count
+
+
+def update_links_in_file(path: Path, rewriter: LinkRewriter, run: BackupRun, page_path: str = '') -> int:
+    """Rewrite links in one file (at site-relative page_path); returns the number of links changed."""
+    text, count = rewriter.rewrite(get_document(path).raw, page_path)
+    if count:
+        run.write_if_changed(path, text)
+    return count
 
 
 def main():
     base = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('.')
-    files = [p for p in base.glob('*.html')]
+    files = html_files(base)
     mapping = {}
+    run = BackupStore(base).start_run('sanitize-filenames')
     # find unsafe files
     for p in files:
         if ' ' in p.name or "'" in p.name or re.search(r"[^A-Za-z0-9_\-\.\u0600-\u06FF]", p.stem):
@@ -58,20 +126,23 @@ def main():
                 if new_path.exists():
                     print(f"Skipping rename {p.name} -> {new} (target exists)")
                     continue
-                # backup
-                bak = p.with_suffix(p.suffix + '.bak')
-                bak.write_text(p.read_text(encoding='utf-8'), encoding='utf-8')
-                p.rename(new_path)
-                mapping[p.name] = new
+                run.rename(p, new_path)
+                mapping[p.relative_to(base).as_posix()] = new_path.relative_to(base).as_posix()
                 print(f"Renamed: {p.name} -> {new}")
 
     # update links in remaining html files
     if mapping:
-        changed = []
-        for p in base.glob('*.html'):
-            if update_links_in_file(p, mapping):
-                changed.append(p.name)
-        print("Updated links in:", ", ".join(changed))
+        rewriter = LinkRewriter(mapping)
+        total = 0
+        for p in html_files(base):
+            page_path = p.relative_to(base).as_posix()
+            count = update_links_in_file(p, rewriter, run, page_path)
+            if count:
+                total += count
+                print(f"Updated {count} links in {page_path}")
+        print(f"Updated {total} links in total")
+        run.save()
+        print(f"Backup run: {run.id}")
     else:
         print("No filenames needed renaming.")
 
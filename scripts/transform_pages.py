@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Run several page rewrites in one read/write pass per page.
+
+Every page is read once, passed through the selected transforms in order
+(in memory), and written once, atomically and only if it changed, with
+the original kept in the backup store (one manifest per run, see
+backup_store.py). The transforms are the ones registered by:
+  fix-headers         scripts/fix_html_headers.py
+  upgrade-template    scripts/upgrade_html_template.py
+  fill-placeholders   scripts/auto_fill_placeholders.py
+  resolve-duplicates  scripts/auto_resolve_duplicates.py
+  lazy-loading        scripts/add_lazy_loading.py
+  critical-css        scripts/upgrade_html_template.py
+
+Usage: python3 scripts/transform_pages.py [base] [--passes a,b,...] [--jobs N]
+"""
+from pathlib import Path
+import argparse
+import importlib
+import sys
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from html_pipeline import TRANSFORMS, run_pipeline  # noqa: E402
+
+# Importing each script registers its transform
+for _module in ('fix_html_headers', 'upgrade_html_template', 'auto_fill_placeholders',
+                'auto_resolve_duplicates', 'add_lazy_loading'):
+    importlib.import_module(_module)
+
+# Structural fixes first, then content edits, then attribute tweaks on the final markup;
+# critical CSS last, since it depends on the final above-the-fold markup
+DEFAULT_PASSES = ['fix-headers', 'upgrade-template', 'fill-placeholders', 'resolve-duplicates', 'lazy-loading',
+                  'critical-css']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply page transforms in a single pass')
+    parser.add_argument('base', nargs='?', default='.')
+    parser.add_argument('--passes', default=','.join(DEFAULT_PASSES),
+                        help=f"comma-separated transforms to run in order (available: {', '.join(TRANSFORMS)})")
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--no-backup', action='store_true', help='do not record originals in the backup store')
+    args = parser.parse_args()
+
+    passes = [p.strip() for p in args.passes.split(',') if p.strip()]
+    unknown = [p for p in passes if p not in TRANSFORMS]
+    if unknown:
+        parser.error(f"unknown transforms: {', '.join(unknown)}")
+
+    results = run_pipeline(args.base, passes, args.jobs, backup=not args.no_backup)
+    counts = {name: 0 for name in passes}
+    updated = 0
+    for result in results:
+        for step, error in result.errors:
+            print(f"{result.path}: {step} failed: {error}")
+        if result.applied:
+            updated += 1
+            print(f"Updated {result.path}: {', '.join(result.applied)}")
+            for name in result.applied:
+                counts[name] += 1
+    for name in passes:
+        print(f"  {name}: {counts[name]} pages")
+    print(f"Total pages written: {updated} of {len(results)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,48 @@
 #!/usr/bin/env python3
 """Upgrade simple HTML files to include the site's common CSS and a basic header/nav.
-Creates a .bak of each file before modifying.
+Originals of modified files go to the backup store (backup_store.py).
 
 It looks for files that contain a simple head (meta charset + viewport) and do NOT already
-link to assets/css/common.min.css, then replaces the <head> content and injects a header
-snippet after the opening <body> tag. It attempts to extract the page title from the first
-<h1> on the page; otherwise a default site title is used.
-
-Usage: python3 scripts/upgrade_html_template.py [directory]
+link to a site stylesheet (assets/css/enhanced.css or nav-enhanced.css), then replaces the
+<head> content and injects a header snippet after the opening <body> tag. It attempts to
+extract the page title from the first <h1> on the page; otherwise a default site title is used.
+
+It also registers the `critical-css` build stage (run after the upgrade unless
+--no-critical-css): the CSS a page needs above the fold (see critical_css.py)
+is inlined into <head> as <style id="critical-css">, and its render-blocking
+<link rel="stylesheet"> tags are turned into preload links that apply the
+full stylesheet asynchronously (with a <noscript> fallback). Re-running the
+stage refreshes the inlined CSS and is a no-op when nothing changed.
+
+Registered as the `upgrade-template` and `critical-css` transforms of
+html_pipeline; see scripts/transform_pages.py to run them together with the
+other page rewrites.
+
+Usage: python3 scripts/upgrade_html_template.py [directory] [--jobs N] [--no-critical-css]
 If no directory given, uses repository root.
 """
 from pathlib import Path
+from urllib.parse import unquote
+import argparse
+import hashlib
+import html
+import os
+import posixpath
 import re
 import sys
 
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from critical_css import CACHE_DIR, critical_css, parse_css  # noqa: E402
+from html_pipeline import register, run_pipeline  # noqa: E402
+from site_scan import DEFAULT_EXCLUDES, walk_site  # noqa: E402
+
 DEFAULT_TITLE = "دليل المال العربي"
 
+# Stylesheets linked by templates/head.html; a page linking either already uses the site template
+SITE_STYLESHEETS = ('assets/css/enhanced.css', 'assets/css/nav-enhanced.css')
+
 # Load template files if present
 TEMPLATES_DIR = Path(__file__).resolve().parent.parent / 'templates'
 HEAD_INJECTION = ''
@@ -28,7 +55,7 @@ if TEMPLATES_DIR.exists():
         if head_file.exists():
                 HEAD_INJECTION = head_file.read_text(encoding='utf-8')
         else:
-                HEAD_INJECTION = '''<meta charset="utf-8">\n  <meta name="viewport" content="width=device-width,initial-scale=1">\n  <link rel=\"stylesheet\" href=\"assets/css/common.min.css\">\n  <link rel=\"stylesheet\" href=\"assets/css/nav.min.css\">\n  <meta name=\"theme-color\" content=\"#0c7954\">\n  <meta property=\"og:image\" content=\"https://zezooo342.github.io/assets/images/og-default.png\"/>\n'''
+                HEAD_INJECTION = '''<meta charset="utf-8">\n  <meta name="viewport" content="width=device-width,initial-scale=1">\n  <link rel=\"stylesheet\" href=\"/assets/css/enhanced.css\">\n  <link rel=\"stylesheet\" href=\"/assets/css/nav-enhanced.css\">\n  <meta name=\"theme-color\" content=\"#0c7954\">\n  <meta property=\"og:image\" content=\"https://zezooo342.github.io/assets/images/og-default.png\"/>\n'''
         if header_file.exists():
                 HEADER_SNIPPET = header_file.read_text(encoding='utf-8')
         else:
@@ -39,27 +66,21 @@ if TEMPLATES_DIR.exists():
                 FOOTER_SNIPPET = '<footer class="site-footer">\n  <div class="wrap">\n    <p>© {year} دليل المال العربي — كل الحقوق محفوظة.</p>\n  </div>\n</footer>\n'
 
 
-def extract_h1(text: str) -> str:
-    m = re.search(r"<h1[^>]*>(.*?)</h1>", text, flags=re.IGNORECASE | re.DOTALL)
-    if not m:
-        return DEFAULT_TITLE
-    title = re.sub(r"<[^>]+>", "", m.group(1)).strip()
-    return title or DEFAULT_TITLE
-
-
-def upgrade_file(path: Path) -> bool:
-    text = path.read_text(encoding='utf-8')
-    # skip if already links common.min.css
-    if 'assets/css/common.min.css' in text:
-        return False
+@register('upgrade-template')
+def upgrade_template(page, context=None) -> str:
+    doc = page.doc
+    text = page.text
+    # skip if it already links the site CSS
+    if any(_local_path(page.path, link.get('href', '')) in SITE_STYLESHEETS for link in doc.head_links):
+        return text
 
     # find head block
     head_match = re.search(r"<head>(.*?)</head>", text, flags=re.IGNORECASE | re.DOTALL)
     if not head_match:
-        return False
+        return text
 
     # create new head using extracted title
-    title = extract_h1(text)
+    title = html.escape(doc.h1, quote=False) or DEFAULT_TITLE
     new_head = f"<head>\n  <title>{title} | {DEFAULT_TITLE}</title>\n  {HEAD_INJECTION}</head>"
 
     new_text = text[:head_match.start()] + new_head + text[head_match.end():]
@@ -68,7 +89,7 @@ def upgrade_file(path: Path) -> bool:
     new_text, n = re.subn(r"<body( [^>]*)?>", lambda m: m.group(0) + "\n" + HEADER_SNIPPET, new_text, count=1, flags=re.IGNORECASE)
     if n == 0:
         # no <body> tag found, skip
-        return False
+        return text
 
     # insert footer before closing </body>
     year = str(__import__('datetime').datetime.today().year)
@@ -77,22 +98,103 @@ def upgrade_file(path: Path) -> bool:
         # case-insensitive replace closing body
         new_text = re.sub(r'</body>', footer + '\n</body>', new_text, flags=re.IGNORECASE, count=1)
 
-    bak = path.with_suffix(path.suffix + '.bak')
-    bak.write_text(text, encoding='utf-8')
-    path.write_text(new_text, encoding='utf-8')
-    return True
+    return new_text
+
+
+CRITICAL_STYLE_RE = re.compile(r'<style id="critical-css">.*?</style>\n?[ \t]*', re.DOTALL)
+LINK_TAG_RE = re.compile(r'<link\b[^>]*>', re.IGNORECASE)
+NOSCRIPT_RE = re.compile(r'<noscript>.*?</noscript>', re.IGNORECASE | re.DOTALL)
+ATTR_RE = re.compile(r"""([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?""")
+ASYNC_STYLESHEET = ('<link rel="preload" href="{href}" as="style" onload="this.rel=\'stylesheet\'">'
+                    '\n{indent}<noscript><link rel="stylesheet" href="{href}"></noscript>')
+
+
+def load_stylesheets(base):
+    """{relative path: (sha1, parsed rules)} for every stylesheet of the site, read once per run."""
+    sheets = {}
+    for f in walk_site(base, ('*.css',), DEFAULT_EXCLUDES):
+        with open(f.full, 'rb') as fh:
+            data = fh.read()
+        sheets[f.path] = (hashlib.sha1(data).hexdigest(), parse_css(data.decode('utf-8', errors='replace')))
+    return {'sheets': sheets, 'cache_dir': os.path.join(os.fspath(base), CACHE_DIR)}
+
+
+def _link_attrs(tag: str):
+    return {m.group(1).lower(): next((v for v in m.group(2, 3, 4) if v is not None), '')
+            for m in ATTR_RE.finditer(tag[len('<link'):-1])}
+
+
+def _local_path(page_path: str, href: str):
+    if not href or href.startswith('//') or re.match(r'[A-Za-z][A-Za-z0-9+.-]*:', href):
+        return None
+    path = unquote(href.split('#', 1)[0].split('?', 1)[0])
+    if path.startswith('/'):
+        return posixpath.normpath(path.lstrip('/'))
+    return posixpath.normpath(posixpath.join(posixpath.dirname(page_path), path))
+
+
+@register('critical-css', prepare=load_stylesheets)
+def inline_critical_css(page, context=None) -> str:
+    head_match = re.search(r"<head\b[^>]*>(.*?)</head>", page.text, flags=re.IGNORECASE | re.DOTALL)
+    if not head_match or not context:
+        return page.text
+    # Start from the page without a previously inlined block so the result is reproducible
+    head = CRITICAL_STYLE_RE.sub('', head_match.group(1))
+    noscript = [m.span() for m in NOSCRIPT_RE.finditer(head)]
+
+    sheets = []
+    edits = []  # (start, end, replacement) in head
+    for m in LINK_TAG_RE.finditer(head):
+        if any(start <= m.start() < end for start, end in noscript):
+            continue
+        attrs = _link_attrs(m.group(0))
+        rel = attrs.get('rel', '').lower()
+        is_preload = rel == 'preload' and attrs.get('as', '').lower() == 'style'
+        if rel != 'stylesheet' and not is_preload:
+            continue
+        sheet = context['sheets'].get(_local_path(page.path, attrs.get('href', '')) or '')
+        if sheet is None or attrs.get('media', 'all').lower() not in ('all', 'screen'):
+            continue
+        if not sheets:
+            line_start = head.rfind('\n', 0, m.start()) + 1
+            indent = head[line_start:m.start()] if not head[line_start:m.start()].strip() else ''
+            first = m.start()
+        sheets.append(sheet)
+        if not is_preload:
+            edits.append((m.start(), m.end(), ASYNC_STYLESHEET.format(href=attrs['href'], indent=indent)))
+
+    if not sheets:
+        return page.text
+    css = critical_css(sheets, page.text, context['cache_dir'])
+    if not css:
+        return page.text
+
+    edits.insert(0, (first, first, f'<style id="critical-css">{css}</style>\n{indent}'))
+    parts = []
+    pos = 0
+    for start, end, replacement in edits:
+        parts.append(head[pos:start])
+        parts.append(replacement)
+        pos = end
+    parts.append(head[pos:])
+    new_head = ''.join(parts)
+    return page.text[:head_match.start(1)] + new_head + page.text[head_match.end(1):]
 
 
 def main():
-    base = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('.')
-    files = [p for p in base.glob('*.html')]
+    parser = argparse.ArgumentParser(description='Upgrade simple pages to the site template')
+    parser.add_argument('base', nargs='?', default='.')
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--no-critical-css', action='store_true', help='do not inline critical CSS')
+    args = parser.parse_args()
+
+    passes = ['upgrade-template'] if args.no_critical_css else ['upgrade-template', 'critical-css']
     updated = []
-    for p in files:
-        try:
-            if upgrade_file(p):
-                updated.append(p.name)
-        except Exception as e:
-            print(f"Failed to upgrade {p}: {e}")
+    for result in run_pipeline(args.base, passes, args.jobs):
+        for step, error in result.errors:
+            print(f"Failed to upgrade {result.path}: {error}")
+        if result.applied:
+            updated.append(result.path)
 
     if updated:
         print("Upgraded files:", ", ".join(updated))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Persistent record of the feed entries ai_growth_system.py has already processed.
+
+An entry is identified by a short SHA-1 of its guid/id, or of its link, or
+of its title, whichever is present first. SeenEntries keeps those keys with
+the time they were first processed in one JSON file
+(.cache/seen_entries.json) and forgets them after `ttl` seconds. The file is
+only rewritten when new entries were marked, so a run that finds nothing new
+reads one small file and writes nothing.
+"""
+from typing import Dict, Iterable, List, Optional
+import hashlib
+import json
+import os
+import time
+
+from backup_store import atomic_write_text
+
+DEFAULT_PATH = os.path.join('.cache', 'seen_entries.json')
+DEFAULT_TTL = 30 * 24 * 3600
+KEY_CHARS = 16
+STORE_VERSION = 1
+
+
+def entry_key(entry) -> Optional[str]:
+    """Identity of a feed entry, or None if it has neither id, link nor title."""
+    for field in ('id', 'link', 'title'):
+        value = (getattr(entry, field, '') or '').strip()
+        if value:
+            return hashlib.sha1(f'{field}:{value}'.encode('utf-8')).hexdigest()[:KEY_CHARS]
+    return None
+
+
+class SeenEntries:
+    def __init__(self, path: str = DEFAULT_PATH, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._seen: Optional[Dict[str, int]] = None
+        self._dirty = False
+
+    def _load(self) -> Dict[str, int]:
+        if self._seen is None:
+            self._seen = {}
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == STORE_VERSION:
+                    self._seen = dict(data.get('entries', {}))
+            except (OSError, ValueError, TypeError, AttributeError):
+                pass
+        return self._seen
+
+    def _live(self, seen_at: int, now: float) -> bool:
+        return not self.ttl or now - seen_at <= self.ttl
+
+    def is_seen(self, entry) -> bool:
+        key = entry_key(entry)
+        seen_at = self._load().get(key) if key else None
+        return seen_at is not None and self._live(seen_at, time.time())
+
+    def new_entries(self, entries: Iterable) -> List:
+        """The entries not processed before, in order."""
+        return [e for e in entries if not self.is_seen(e)]
+
+    def mark(self, entries: Iterable):
+        seen = self._load()
+        now = int(time.time())
+        for entry in entries:
+            key = entry_key(entry)
+            if key and not (key in seen and self._live(seen[key], now)):
+                seen[key] = now
+                self._dirty = True
+
+    def save(self) -> bool:
+        """Write the store, without expired keys, if entries were marked; returns True if written."""
+        if not self._dirty:
+            return False
+        now = time.time()
+        seen = {k: t for k, t in self._load().items() if self._live(t, now)}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        atomic_write_text(self.path, json.dumps({'version': STORE_VERSION, 'entries': seen}, sort_keys=True))
+        self._seen = seen
+        self._dirty = False
+        return True
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""Shared site walker and parsed-document cache used by generate_sitemap.py and scripts/*.py.
+
+Walks the site recursively with os.scandir, applies include/exclude glob
+rules and collects each file's stat result during the walk so consumers do
+not need to stat it again. An optional thread pool lists and stats
+directories concurrently for slow (network/overlay) filesystems.
+
+DocumentCache reads each page once per run and tokenizes it at most once,
+exposing a SiteDocument (title, h1, visible text, links, images, head
+metadata, placeholder hits). Entries are invalidated when a file's mtime or
+size changes, so a script that rewrites a page sees the new content.
+SiteDocument.from_text() wraps HTML that is not on disk (yet) the same way.
+Visible text excludes script/style/template content and nav/footer chrome,
+with whitespace collapsed and Arabic presentation forms folded to their
+base letters.
+
+Glob rules follow .gitignore conventions: a pattern without a slash matches
+an entry's name at any depth, a pattern with a slash matches the path
+relative to the scan root, and a leading slash anchors a name to the root
+(``/index.html`` excludes the home page but not ``blog/index.html``).
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from html.parser import HTMLParser
+from pathlib import Path
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, TypeVar
+import hashlib
+import mmap
+import os
+import re
+import unicodedata
+
+# Directories that never contain publishable pages
+DEFAULT_EXCLUDES = ('.*', '__pycache__', 'node_modules', 'templates')
+
+# Placeholder markers left behind by the article generators
+PLACEHOLDER_PATTERNS = [
+    r"\.\.\.\.+\s*\(أضف فقرة أصلية هنا\)",
+    r"أضف\s+فقرة",
+]
+
+# Files at least this large are scanned through mmap instead of being read into memory
+MMAP_THRESHOLD = 1 << 20
+
+# Line boundaries recognised by str.splitlines() (besides '\r', which is normalized away)
+LINE_SEPARATORS = '\n\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+
+# Elements whose content is never visible text
+SKIP_TAGS = frozenset({'script', 'style', 'noscript', 'template'})
+# Site chrome repeated on every page; excluded from visible text but still scanned for links
+CHROME_TAGS = frozenset({'nav', 'footer'})
+
+# Arabic Presentation Forms-A/B (ligatures and positional glyphs) and the BOM
+_PRESENTATION_RE = re.compile('[\uFB50-\uFDFF\uFE70-\uFEFF]+')
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and fold Arabic presentation forms to base letters (NFKC on those blocks only)."""
+    text = _PRESENTATION_RE.sub(lambda m: unicodedata.normalize('NFKC', m.group()).replace('\ufeff', ''), text)
+    return ' '.join(text.split())
+
+
+class SiteFile(NamedTuple):
+    path: str       # relative to the scan root, always '/'-separated
+    full: str       # path usable with open()
+    size: int
+    mtime_ns: int
+
+    @property
+    def name(self) -> str:
+        return self.path.rsplit('/', 1)[-1]
+
+    @property
+    def mtime(self) -> float:
+        return self.mtime_ns / 1e9
+
+
+def _matches(rel: str, name: str, patterns: Sequence[str]) -> bool:
+    for pattern in patterns:
+        if pattern.startswith('/'):
+            if fnmatchcase(rel, pattern[1:]):
+                return True
+        elif fnmatchcase(rel if '/' in pattern else name, pattern):
+            return True
+    return False
+
+
+def _scan_dir(full: str, rel: str, include: Sequence[str],
+              exclude: Sequence[str]) -> Tuple[List[SiteFile], List[Tuple[str, str]]]:
+    """List one directory: return (matching files, subdirectories to descend into), both sorted."""
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(full) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return files, subdirs
+    for entry in entries:
+        entry_rel = f"{rel}/{entry.name}" if rel else entry.name
+        if _matches(entry_rel, entry.name, exclude):
+            continue
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append((entry.path, entry_rel))
+            elif entry.is_file() and _matches(entry_rel, entry.name, include):
+                st = entry.stat()
+                files.append(SiteFile(entry_rel, entry.path, st.st_size, st.st_mtime_ns))
+        except OSError:
+            continue
+    return files, subdirs
+
+
+def walk_site(root='.', include: Sequence[str] = ('*.html',),
+              exclude: Sequence[str] = DEFAULT_EXCLUDES, jobs: int = 1) -> Iterator[SiteFile]:
+    """Yield matching files depth-first: each directory's files in name order, then its subdirectories.
+
+    With jobs > 1, subdirectories are listed and stat'ed ahead of time on a
+    thread pool; the yielded order is the same as the sequential walk.
+    """
+    root = os.fspath(root)
+    if jobs <= 1:
+        pending = [(root, '')]
+        while pending:
+            full, rel = pending.pop()
+            files, subdirs = _scan_dir(full, rel, include, exclude)
+            yield from files
+            pending.extend(reversed(subdirs))
+        return
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        def submit(full, rel):
+            return pool.submit(_scan_dir, full, rel, include, exclude)
+
+        pending = [submit(root, '')]
+        while pending:
+            files, subdirs = pending.pop().result()
+            yield from files
+            pending.extend(reversed([submit(full, rel) for full, rel in subdirs]))
+
+
+def universal_newlines(text: str) -> str:
+    """Same newline handling as Path.read_text()."""
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def load_patterns(path) -> List[str]:
+    """Read one regex per line from a patterns file; blank lines and lines starting with '#' are skipped."""
+    with open(path, encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+class PlaceholderScanner:
+    """Find lines matching any placeholder pattern with one compiled alternation per buffer.
+
+    Results match a per-line scan ([{'line': n, 'text': stripped line}]):
+    line boundaries are only computed for buffers that contain a match,
+    and a match spanning a line break is re-checked within its first line.
+    Large files are mmap'd and decoded in line-aligned windows, so memory
+    stays bounded without losing Unicode-aware matching.
+    """
+
+    def __init__(self, patterns: Optional[Sequence[str]] = None):
+        self.patterns = list(PLACEHOLDER_PATTERNS if patterns is None else patterns)
+        combined = '|'.join(f'(?:{p})' for p in self.patterns) or '(?!)'
+        self._re = re.compile(combined, re.IGNORECASE | re.UNICODE)
+
+    def scan_text(self, buf: str) -> List[Dict[str, object]]:
+        pattern = self._re
+        match = pattern.search(buf)
+        if match is None:
+            return []
+        # Offset of every line start (plus the buffer end), looked up by bisect for each match
+        starts = list(accumulate(map(len, buf.splitlines(True)), initial=0))
+        hits = []
+        while match is not None:
+            index = bisect_right(starts, match.start()) - 1
+            start, next_start = starts[index], starts[index + 1]
+            line = buf[start:next_start].rstrip('\r' + LINE_SEPARATORS)
+            end = start + len(line)
+            if match.end() <= end or pattern.search(buf, start, end):
+                hits.append({'line': index + 1, 'text': line.strip()})
+            match = pattern.search(buf, next_start) if next_start < len(buf) else None
+        return hits
+
+    def scan_file(self, path) -> List[Dict[str, object]]:
+        """Scan a file; files of MMAP_THRESHOLD bytes or more are mapped and decoded in line-aligned windows."""
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < MMAP_THRESHOLD:
+                return self.scan_text(universal_newlines(f.read().decode('utf-8')))
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                hits = []
+                line_offset = 0
+                pos = 0
+                while pos < size:
+                    end = mapped.find(b'\n', min(pos + MMAP_THRESHOLD, size) - 1)
+                    end = size if end < 0 else end + 1
+                    text = universal_newlines(mapped[pos:end].decode('utf-8'))
+                    for hit in self.scan_text(text):
+                        hit['line'] += line_offset
+                        hits.append(hit)
+                    # Windows end at a newline, so their line count is their separator count
+                    line_offset += sum(text.count(sep) for sep in LINE_SEPARATORS)
+                    pos = end
+                return hits
+
+
+DEFAULT_SCANNER = PlaceholderScanner()
+
+
+def html_files(base='.', include: Sequence[str] = ('*.html',),
+               exclude: Optional[Sequence[str]] = None, jobs: int = 1) -> List[Path]:
+    """Convenience wrapper for scripts that work with Path objects."""
+    exclude = DEFAULT_EXCLUDES if exclude is None else exclude
+    return [Path(f.full) for f in walk_site(base, include, exclude, jobs)]
+
+
+def process_map(fn: Callable[[T], R], items: Iterable[T], jobs: int = 1, chunksize: int = 8) -> Iterator[R]:
+    """map() over a process pool when jobs > 1 (fn must be a module-level function); results keep input order."""
+    if jobs <= 1:
+        yield from map(fn, items)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(fn, items, chunksize=chunksize)
+
+
+class _DocumentParser(HTMLParser):
+    """Collect everything the site tools need from one tokenization of a page."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.doctype = False
+        self.has_html_tag = False
+        self.title = ''
+        self.h1 = ''
+        self.text_parts = []
+        self.links = []
+        self.images = []
+        self.meta = {}
+        self.head_links = []
+        self._skip = 0
+        self._chrome = 0
+        self._in_title = False
+        self._in_h1 = False
+        self._h1_parts = []
+        self._title_parts = []
+
+    def handle_decl(self, decl):
+        if decl.lower().startswith('doctype'):
+            self.doctype = True
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {k: (v or '') for k, v in attrs}
+        if tag in SKIP_TAGS:
+            self._skip += 1
+        elif tag in CHROME_TAGS:
+            self._chrome += 1
+        elif tag == 'html':
+            self.has_html_tag = True
+        elif tag == 'title':
+            self._in_title = True
+        elif tag == 'h1' and not self.h1:
+            self._in_h1 = True
+        elif tag == 'a' and attrs.get('href'):
+            self.links.append(attrs['href'])
+        elif tag == 'img':
+            self.images.append(attrs)
+        elif tag == 'meta':
+            key = attrs.get('name') or attrs.get('property') or attrs.get('http-equiv')
+            if key:
+                self.meta[key.lower()] = attrs.get('content', '')
+            elif 'charset' in attrs:
+                self.meta['charset'] = attrs['charset']
+        elif tag == 'link':
+            self.head_links.append(attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in SKIP_TAGS:
+            self._skip -= 1
+        elif tag in CHROME_TAGS:
+            self._chrome -= 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in CHROME_TAGS:
+            self._chrome = max(0, self._chrome - 1)
+        elif tag == 'title':
+            self._in_title = False
+            self.title = ' '.join(''.join(self._title_parts).split())
+        elif tag == 'h1' and self._in_h1:
+            self._in_h1 = False
+            self.h1 = ' '.join(''.join(self._h1_parts).split())
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+            return
+        if self._skip:
+            return
+        if self._in_h1:
+            self._h1_parts.append(data)
+        if not self._chrome:
+            self.text_parts.append(data)
+
+
+class SiteDocument:
+    """One page read from disk; parsed fields are filled by a single lazy tokenization."""
+
+    def __init__(self, path: str, data: bytes, size: int, mtime_ns: int):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.sha1 = hashlib.sha1(data).hexdigest()
+        self.raw = universal_newlines(data.decode('utf-8'))
+        self._parsed = None
+        self._placeholder_hits = None
+
+    @classmethod
+    def from_text(cls, text: str, path: str = '', mtime_ns: int = 0) -> 'SiteDocument':
+        """Document for in-memory HTML, such as a page being rewritten or generated."""
+        data = text.encode('utf-8')
+        return cls(path, data, len(data), mtime_ns)
+
+    def _parser(self) -> _DocumentParser:
+        if self._parsed is None:
+            parser = _DocumentParser()
+            parser.feed(self.raw)
+            parser.close()
+            self._parsed = parser
+        return self._parsed
+
+    @property
+    def title(self) -> str:
+        return self._parser().title
+
+    @property
+    def h1(self) -> str:
+        return self._parser().h1
+
+    @property
+    def text(self) -> str:
+        """Visible text (no title/script/style/nav/footer), whitespace collapsed and normalized."""
+        return normalize_text(' '.join(self._parser().text_parts))
+
+    @property
+    def links(self) -> List[str]:
+        return self._parser().links
+
+    @property
+    def images(self) -> List[Dict[str, str]]:
+        return self._parser().images
+
+    @property
+    def meta(self) -> Dict[str, str]:
+        return self._parser().meta
+
+    @property
+    def head_links(self) -> List[Dict[str, str]]:
+        return self._parser().head_links
+
+    @property
+    def is_fragment(self) -> bool:
+        """True if the page has neither a doctype nor an <html> element."""
+        parser = self._parser()
+        return not (parser.doctype or parser.has_html_tag)
+
+    @property
+    def placeholder_hits(self) -> List[Dict[str, object]]:
+        """Lines matching PLACEHOLDER_PATTERNS, as [{'line': n, 'text': stripped line}]."""
+        if self._placeholder_hits is None:
+            self._placeholder_hits = DEFAULT_SCANNER.scan_text(self.raw)
+        return self._placeholder_hits
+
+
+class DocumentCache:
+    """Per-run cache of SiteDocument objects keyed by absolute path, validated by mtime + size."""
+
+    def __init__(self):
+        self._docs: Dict[str, SiteDocument] = {}
+
+    @staticmethod
+    def _key(path) -> str:
+        return os.path.abspath(os.fspath(path))
+
+    def _fresh(self, key: str, size: int, mtime_ns: int) -> Optional[SiteDocument]:
+        doc = self._docs.get(key)
+        if doc is not None and doc.size == size and doc.mtime_ns == mtime_ns:
+            return doc
+        return None
+
+    def get(self, path, size: Optional[int] = None, mtime_ns: Optional[int] = None) -> SiteDocument:
+        """Return the cached document, re-reading the file if it changed since it was cached."""
+        key = self._key(path)
+        if size is None or mtime_ns is None:
+            st = os.stat(key)
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+        doc = self._fresh(key, size, mtime_ns)
+        if doc is None:
+            with open(key, 'rb') as f:
+                data = f.read()
+            doc = SiteDocument(os.fspath(path), data, size, mtime_ns)
+            self._docs[key] = doc
+        return doc
+
+    def content_sha1(self, path, size: int, mtime_ns: int) -> str:
+        """SHA-1 of a file, from the cache when fresh, otherwise streamed without caching."""
+        doc = self._fresh(self._key(path), size, mtime_ns)
+        if doc is not None:
+            return doc.sha1
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def documents(self, base='.', include: Sequence[str] = ('*.html',),
+                  exclude: Optional[Sequence[str]] = None, jobs: int = 1) -> Iterator[SiteDocument]:
+        """Walk the site and yield a document per page, reusing the walk's stat results."""
+        exclude = DEFAULT_EXCLUDES if exclude is None else exclude
+        for f in walk_site(base, include, exclude, jobs):
+            yield self.get(f.full, f.size, f.mtime_ns)
+
+    def clear(self):
+        self._docs.clear()
+
+
+# Shared by every tool running in the same process
+DEFAULT_CACHE = DocumentCache()
+
+
+def get_document(path) -> SiteDocument:
+    return DEFAULT_CACHE.get(path)
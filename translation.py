@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Cached, batched translation for ai_growth_system.py.
+
+CachedTranslator looks every text up in a TranslationCache first, keyed by
+(SHA-1 of the source text, target language), and sends all misses of a call
+to the backend as one batch. The cache is a single JSON file
+(.cache/translations.json) kept in least-recently-used order; it is written
+only when a call added entries (hits only reorder it in memory; the order is
+saved with the next write), and trimmed to max_entries.
+
+Backends are objects with translate_batch(texts, dest) -> translations:
+GoogletransBackend when googletrans is installed, IdentityBackend (returns
+the texts unchanged) otherwise or as a stand-in in tests. If the backend
+fails, the original texts are returned and nothing is cached; neither is
+IdentityBackend output, so installing googletrans later takes effect.
+"""
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+
+from backup_store import atomic_write_text
+
+try:
+    from googletrans import Translator as _GoogleTranslator  # type: ignore
+except Exception:
+    _GoogleTranslator = None
+
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'translations.json')
+DEFAULT_MAX_ENTRIES = 5000
+CACHE_VERSION = 1
+
+
+class IdentityBackend:
+    """Returns the texts unchanged (no translation service available); its output is not cached."""
+
+    cacheable = False
+
+    def translate_batch(self, texts: Sequence[str], dest: str) -> List[str]:
+        return list(texts)
+
+
+class GoogletransBackend:
+    def translate_batch(self, texts: Sequence[str], dest: str) -> List[str]:
+        # A fresh client per batch: googletrans >= 4 is async and its client is tied to one event loop
+        result = _GoogleTranslator().translate(list(texts), dest=dest)
+        if inspect.isawaitable(result):
+            result = asyncio.run(result)
+        return [r.text for r in result]
+
+
+def default_backend():
+    return GoogletransBackend() if _GoogleTranslator is not None else IdentityBackend()
+
+
+def cache_key(text: str, dest: str) -> str:
+    return dest + ':' + hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """Persistent LRU map of cache_key -> translation, loaded on first use."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: Optional[OrderedDict] = None
+        self._dirty = False
+
+    def _load(self) -> OrderedDict:
+        if self._entries is None:
+            self._entries = OrderedDict()
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == CACHE_VERSION:
+                    self._entries.update((k, v) for k, v in data.get('entries', []))
+            except (OSError, ValueError, TypeError, AttributeError):
+                pass
+        return self._entries
+
+    def get(self, text: str, dest: str) -> Optional[str]:
+        entries = self._load()
+        key = cache_key(text, dest)
+        value = entries.get(key)
+        if value is not None:
+            entries.move_to_end(key)
+        return value
+
+    def put(self, text: str, dest: str, translation: str):
+        entries = self._load()
+        key = cache_key(text, dest)
+        entries[key] = translation
+        entries.move_to_end(key)
+        self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def save(self) -> bool:
+        """Write the cache (oldest entries beyond max_entries dropped) if it changed; returns True if written."""
+        if not self._dirty:
+            return False
+        entries = self._load()
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        atomic_write_text(self.path, json.dumps({'version': CACHE_VERSION, 'entries': list(entries.items())},
+                                                ensure_ascii=False))
+        self._dirty = False
+        return True
+
+
+class CachedTranslator:
+    def __init__(self, backend=None, cache: Optional[TranslationCache] = None):
+        self.backend = backend if backend is not None else default_backend()
+        self.cache = cache if cache is not None else TranslationCache()
+        self.backend_calls = 0
+
+    def translate_many(self, texts: Sequence[str], dest: str = 'ar') -> List[str]:
+        """Translations of texts in order; all cache misses go to the backend in one batch."""
+        found = {}
+        misses: List[str] = []
+        for text in texts:
+            if text in found:
+                continue
+            cached = self.cache.get(text, dest) if text.strip() else text
+            if cached is None:
+                misses.append(text)
+                found[text] = text  # until translated
+            else:
+                found[text] = cached
+        if misses:
+            self.backend_calls += 1
+            try:
+                translated = self.backend.translate_batch(misses, dest)
+                if len(translated) != len(misses):
+                    raise ValueError(f'backend returned {len(translated)} translations for {len(misses)} texts')
+            except Exception as e:
+                print(f"Translation failed, keeping original text: {e}")
+                translated = None
+            cacheable = translated is not None and getattr(self.backend, 'cacheable', True)
+            for text, result in zip(misses, translated or ()):
+                if result:
+                    found[text] = result
+                    if cacheable:
+                        self.cache.put(text, dest, result)
+        self.cache.save()
+        return [found[text] for text in texts]
+
+    def translate(self, text: str, dest: str = 'ar') -> str:
+        return self.translate_many([text], dest)[0]